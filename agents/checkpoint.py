@@ -0,0 +1,239 @@
+import json
+import math
+import os
+import threading
+import numpy as np
+import torch
+
+def snapshot(obj):
+    """Deep copy of a (nested) state dict with every tensor detached and cloned, safe to write later."""
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().clone()
+    if isinstance(obj, dict):
+        return {k: snapshot(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(snapshot(v) for v in obj)
+    return obj
+
+def dump_json(obj, path):
+    with open(path, 'w') as f:
+        json.dump(obj, f)
+
+def atomic_save(obj, path, dump=torch.save):
+    """Writes to a temp file beside `path` then renames it over, so readers never see a partial file."""
+    directory = os.path.dirname(path)
+    if directory: os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.tmp"
+    dump(obj, tmp)
+    os.replace(tmp, path)
+
+class CheckpointWriter:
+    """
+    Background writer for brain checkpoints and the training state file. Callers hand over
+    snapshot() copies and return immediately; a daemon thread writes them with atomic_save().
+    Pending writes to the same path coalesce (only the newest snapshot is written).
+    """
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.pending = {} # path -> (payload, dump), in submission order
+        self.busy = False
+        self.files_written = 0
+        self.errors = 0
+        self.last_error = None
+        self._thread = None
+
+    def submit(self, path, payload, dump=torch.save):
+        with self.cond:
+            self.pending.pop(path, None) # Re-queue at the end so write order follows submission order
+            self.pending[path] = (payload, dump)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="CheckpointWriter", daemon=True)
+                self._thread.start()
+            self.cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Blocks until every submitted checkpoint is on disk."""
+        with self.cond:
+            return self.cond.wait_for(lambda: not self.pending and not self.busy, timeout)
+
+    def discard(self):
+        """Drops queued writes and waits out the one in progress (e.g. before brain files are wiped)."""
+        with self.cond:
+            self.pending.clear()
+            self.cond.wait_for(lambda: not self.busy)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.pending)
+                path = next(iter(self.pending))
+                payload, dump = self.pending.pop(path)
+                self.busy = True
+            try:
+                atomic_save(payload, path, dump)
+                self.files_written += 1
+            except Exception as e: # A failed checkpoint must never take the simulation down
+                self.errors += 1
+                self.last_error = e
+            with self.cond:
+                self.busy = False
+                self.cond.notify_all()
+
+# --- Department checkpoint: one file for every brain, optimizer, buffer and agent scalar ---
+# Layout: MAGIC | uint64 header length | JSON header | tensor bytes (each ALIGN-aligned).
+# The header holds `meta`, each entry's structure (tensors replaced by {"__tensor__": i}) and the
+# tensor index [offset, dtype, shape], so a reader maps the file once and decodes entries on demand.
+MAGIC = b'DEPTCKPT'
+FORMAT_VERSION = 1
+ALIGN = 64
+
+def _encode(obj, tensors):
+    if isinstance(obj, torch.Tensor):
+        tensors.append(obj)
+        return {'__tensor__': len(tensors) - 1}
+    if isinstance(obj, dict):
+        if all(isinstance(k, str) and not k.startswith('__') for k in obj):
+            return {k: _encode(v, tensors) for k, v in obj.items()}
+        return {'__items__': [[k, _encode(v, tensors)] for k, v in obj.items()]} # e.g. optimizer state keyed by int
+    if isinstance(obj, tuple):
+        return {'__tuple__': [_encode(v, tensors) for v in obj]}
+    if isinstance(obj, list):
+        return [_encode(v, tensors) for v in obj]
+    return obj
+
+def _decode(obj, tensor):
+    if isinstance(obj, dict):
+        if '__tensor__' in obj: return tensor(obj['__tensor__'])
+        if '__items__' in obj: return {k: _decode(v, tensor) for k, v in obj['__items__']}
+        if '__tuple__' in obj: return tuple(_decode(v, tensor) for v in obj['__tuple__'])
+        return {k: _decode(v, tensor) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_decode(v, tensor) for v in obj]
+    return obj
+
+def save_department(department, path):
+    """Writes {'meta': {...}, 'entries': {name: nested state}} in the department format (a CheckpointWriter dump)."""
+    tensors = []
+    entries = {name: _encode(state, tensors) for name, state in department['entries'].items()}
+    arrays = [t.detach().cpu().contiguous().numpy() for t in tensors]
+    index, offset = [], 0
+    for array in arrays:
+        index.append([offset, array.dtype.str, list(array.shape)])
+        offset += -(-array.nbytes // ALIGN) * ALIGN
+    header = json.dumps({'version': FORMAT_VERSION, 'meta': department.get('meta', {}), 'entries': entries, 'tensors': index}).encode()
+    data_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGN) * ALIGN
+    header += b' ' * (data_start - len(MAGIC) - 8 - len(header)) # Pad so tensor data starts aligned
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, 'little'))
+        f.write(header)
+        for (start, _, _), array in zip(index, arrays):
+            f.seek(data_start + start)
+            f.write(array.tobytes())
+
+class DepartmentCheckpoint:
+    """
+    Reader for save_department() files. Opening parses only the header; entry(name) decodes one
+    entry, building its tensors from a copy-on-write memory map of the file (pages load on first touch).
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a department checkpoint")
+            header_len = int.from_bytes(f.read(8), 'little')
+            header = json.loads(f.read(header_len))
+        if header['version'] > FORMAT_VERSION:
+            raise ValueError(f"{path} has checkpoint format v{header['version']}, newer than v{FORMAT_VERSION}")
+        self.meta = header['meta']
+        self.entries = header['entries']
+        self.index = header['tensors']
+        data_start = len(MAGIC) + 8 + header_len
+        has_data = os.path.getsize(path) > data_start # All-empty tensors leave no data section to map
+        self.data = np.memmap(path, dtype=np.uint8, mode='c', offset=data_start) if has_data else b''
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def entry(self, name):
+        return _decode(self.entries[name], self.tensor)
+
+    def tensor(self, i):
+        offset, dtype, shape = self.index[i]
+        array = np.frombuffer(self.data, dtype=dtype, count=math.prod(shape), offset=offset)
+        return torch.from_numpy(array.reshape(shape))
+
+def brain_state(agent, include_memory=False):
+    """Networks, optimizer and step count of a DQN learner (and optionally its replay buffer)."""
+    state = {
+        'model_state_dict': agent.policy_net.state_dict(),
+        'target_state_dict': agent.target_net.state_dict(),
+        'optimizer_state_dict': agent.optimizer.state_dict(),
+        'steps_done': agent.steps_done,
+    }
+    if include_memory:
+        state['memory'] = agent.memory.state_dict()
+    return snapshot(state)
+
+class LazyBrain:
+    """
+    Mixin deferring an agent's networks, optimizer and replay buffer until one of them is first
+    touched (normally its first decision). The subclass implements build_brain() and calls
+    defer_brain() in __init__; the brain is then built and loaded from `brain_source`: 'file'
+    (load_brain()), a brain_state() dict (e.g. a department checkpoint entry) or None (fresh).
+    """
+    BRAIN_ATTRS = ('policy_net', 'target_net', 'optimizer', 'memory')
+
+    def defer_brain(self, load=True):
+        self.brain_source = 'file' if load else None
+
+    def __getattr__(self, name): # Only reached while the attribute does not exist yet
+        if name in LazyBrain.BRAIN_ATTRS and 'brain_source' in self.__dict__:
+            source = self.__dict__.pop('brain_source')
+            self.build_brain()
+            if source == 'file':
+                self.load_brain()
+            elif source is not None:
+                try:
+                    load_brain_state(self, source)
+                except (KeyError, RuntimeError, ValueError):
+                    pass # Architecture changed since the checkpoint: keep the fresh brain
+            return getattr(self, name)
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+def load_brain_state(agent, state):
+    agent.policy_net.load_state_dict(state['model_state_dict'])
+    agent.target_net.load_state_dict(state['target_state_dict'])
+    agent.optimizer.load_state_dict(state['optimizer_state_dict'])
+    agent.steps_done = state['steps_done']
+    if 'memory' in state:
+        agent.memory.load_state_dict(state['memory'])
+
+def agent_state(agent, include_memory=False):
+    """One agent's department checkpoint entry: its CHECKPOINT_FIELDS, registry row and own brain."""
+    state = {'cop_type': agent.cop_type, 'fields': {name: getattr(agent, name) for name in agent.CHECKPOINT_FIELDS}}
+    if getattr(agent, 'registry', None) is not None:
+        state['registry'] = agent.registry.row(agent.reg_slot)
+        state['slot'] = agent.reg_slot
+    if getattr(agent, 'population', None) is not None:
+        agent.population.sync_agent(agent)
+    source = agent.__dict__.get('brain_source')
+    if isinstance(source, dict): # Restored but never used since: pass the saved brain through unbuilt
+        state['brain'] = source
+    elif getattr(agent, 'policy_net', None) is not None: # Shared-brain officers have none of their own
+        state['brain'] = brain_state(agent, include_memory)
+    return state
+
+def restore_agent(agent, state):
+    """Applies an agent_state() entry to a freshly constructed agent of the same type."""
+    for name, value in state['fields'].items():
+        setattr(agent, name, value)
+    for name, value in state.get('registry', {}).items(): # Straight into the row; PopulationStats is rebuilt after a restore
+        if name in agent.registry.columns: agent.registry.columns[name][agent.reg_slot] = value
+    if 'brain' in state and 'brain_source' in agent.__dict__:
+        agent.brain_source = state['brain'] # Applied when the brain is first used
+    elif 'brain' in state and getattr(agent, 'policy_net', None) is not None:
+        try:
+            load_brain_state(agent, state['brain'])
+        except (KeyError, RuntimeError, ValueError):
+            pass # Architecture changed since the checkpoint: keep the fresh brain
@@ -1,19 +1,34 @@
-import random
 import math
 import numpy as np
 import os
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from collections import deque, namedtuple
 from agents.dqn_model import DQN
+from agents.replay_buffer import ReplayBuffer, scheduled_steps
+from agents.registry import AgentRegistry, RegistryField
+from agents.checkpoint import LazyBrain, snapshot, atomic_save
+from agents.featurizer import StateFeaturizer
 import config
 
-# Define Transition tuple for Replay Memory
-Transition = namedtuple('Transition', ('state', 'action', 'next_state', 'reward'))
+class CorruptCop(LazyBrain):
+    # Officer state lives in an AgentRegistry row (see agents/registry.py)
+    corruption_score = RegistryField(stat_sum='corruption_sum')
+    paranoia_level = RegistryField()
+    loyalty_score = RegistryField()
+    times_bribed = RegistryField()
+    times_caught = RegistryField()
+    total_money_earned = RegistryField(stat_sum='wealth_sum')
+    last_caught_episode = RegistryField()
+    # Plain attributes a department checkpoint stores next to the registry row (see agents/checkpoint.py)
+    CHECKPOINT_FIELDS = ('name', 'personality', 'epsilon', 'pending_updates')
+    # Exploration draws; the engine hands the acting officer its seeded stream each episode (see environment/rng.py)
+    rng = np.random.default_rng()
 
-class CorruptCop:
-    def __init__(self, agent_id, name, personality, corruption_score):
+    def __init__(self, agent_id, name, personality, corruption_score, shared_brain=None, slot=None, registry=None, load=True):
+        self.stats = None # PopulationStats this officer reports to (see agents/population_stats.py)
+        self.registry = registry if registry is not None else AgentRegistry(capacity=1) # Private store by default
+        self.reg_slot = self.registry.allocate(self, 'corrupt')
         self.agent_id = agent_id
         self.name = name
         self.cop_type = 'corrupt'
@@ -36,22 +51,40 @@ class CorruptCop:
         # Device Check
         self.device = torch.device("cpu")
         
-        self.policy_net = DQN(self.input_dim, self.output_dim, config.HIDDEN_DIM).to(self.device)
-        self.target_net = DQN(self.input_dim, self.output_dim, config.HIDDEN_DIM).to(self.device)
-        self.target_net.load_state_dict(self.policy_net.state_dict())
-        self.target_net.eval()
-        
-        self.optimizer = optim.Adam(self.policy_net.parameters(), lr=config.ALPHA)
-        self.memory = deque(maxlen=config.MEMORY_SIZE)
-        
         self.epsilon = config.EPSILON_START
         self.steps_done = 0
+        self.pending_updates = 0 # Transitions stored since the last training call
         
         self.last_state = None
         self.last_action = None
+        # Reused rows for featurization: 0 = the decision's state (kept as last_state), 1 = the next state
+        self.featurizer = StateFeaturizer(capacity=2, device=self.device)
+
+        # Stacked/vmapped training container (see agents/population.py) and this officer's row in it, set by CopPopulation
+        self.population = None
+        self.population_row = None
+
+        # Shared population brain (see agents/shared_brain.py): no per-officer networks
+        self.shared_brain = shared_brain
+        if shared_brain is not None:
+            if slot is None:
+                self.slot = shared_brain.allocate_slot(agent_id)
+            else:
+                self.slot = slot
+                shared_brain.transfer_slot(slot, agent_id)
+            return
 
-        # Try to load existing brain
-        self.load_brain()
+        # Networks are built on first use; load=False: a department checkpoint supplies the brain instead of a .pth file
+        self.defer_brain(load)
+
+    def build_brain(self):
+        self.policy_net = DQN(self.input_dim, self.output_dim, config.HIDDEN_DIM).to(self.device)
+        self.target_net = DQN(self.input_dim, self.output_dim, config.HIDDEN_DIM).to(self.device)
+        self.target_net.load_state_dict(self.policy_net.state_dict())
+        self.target_net.eval()
+        
+        self.optimizer = optim.Adam(self.policy_net.parameters(), lr=config.ALPHA)
+        self.memory = ReplayBuffer(config.MEMORY_SIZE, self.input_dim, self.device)
 
     def get_state_vector(self, state, current_episode):
         """
@@ -104,18 +137,24 @@ class CorruptCop:
         # Based on corruption score + paranoia
         suspicion_val = min((self.corruption_score + (self.paranoia_level * 100)) / 200.0, 1.0)
 
-        return torch.tensor([
+        # Reference version, allocating a tensor per call; decisions use StateFeaturizer.featurize_one() instead
+        return torch.from_numpy(np.array([
             w_norm, ia_val, offer_norm, sev_norm, alert_val,
             ev_norm, war_val, gang_val, seized_norm, aggr_norm,
             caught_norm, wealth_norm, recency_val, suspicion_val
-        ], dtype=torch.float32).to(self.device)
+        ], dtype=np.float32)).to(self.device)
 
     def decide_bribe(self, state, current_episode=0):
-        state_tensor = self.get_state_vector(state, current_episode)
+        if self.shared_brain is not None:
+            return self.shared_brain.decide_bribes([self], [state], current_episode)[0]
+
+        state_tensor = self.featurizer.featurize_one(self, state, current_episode, row=0)
         self.last_state = state_tensor
         
-        if random.random() < self.epsilon:
-            action_idx = random.randint(0, self.output_dim - 1)
+        if self.rng.random() < self.epsilon:
+            action_idx = int(self.rng.integers(self.output_dim))
+        elif self.population is not None:
+            action_idx = self.population.q_single(self, state_tensor).argmax().item()
         else:
             with torch.no_grad():
                 # Policy Net -> Q-Values -> Argmax
@@ -125,53 +164,58 @@ class CorruptCop:
         self.last_action = action_idx
         return config.ACTIONS[action_idx]
 
-    def learn(self, reward, current_episode=0, next_state_raw=None):
+    def learn(self, reward, current_episode=0, next_state_raw=None, train=True):
+        """Stores the transition and (unless train=False) trains on schedule. Returns gradient steps taken."""
         if self.last_state is None or self.last_action is None:
-            return
+            return 0
 
         # Store Transition in Memory
-        action_tensor = torch.tensor([[self.last_action]], device=self.device)
-        reward_tensor = torch.tensor([reward], device=self.device)
-        
         if next_state_raw:
-            next_state_tensor = self.get_state_vector(next_state_raw, current_episode)
+            next_state_tensor = self.featurizer.featurize_one(self, next_state_raw, current_episode, row=1)
         else:
             next_state_tensor = None
 
-        self.memory.append(Transition(self.last_state, action_tensor, next_state_tensor, reward_tensor))
-        
-        # Optimize Model
-        self.optimize_model()
+        self.remember(self.last_state, self.last_action, reward, next_state_tensor)
+
+        # A CopPopulation trains all officers together (driven by the engine)
+        if not train or self.population is not None:
+            return 0
+        return self.shared_brain.train() if self.shared_brain is not None else self.train()
+
+    def remember(self, state_tensor, action_idx, reward, next_state_tensor=None):
+        """Stores one transition in whichever memory trains this officer, then decays epsilon."""
+        if self.shared_brain is not None:
+            self.shared_brain.push(self.slot, state_tensor, action_idx, reward, next_state_tensor)
+        else:
+            self.memory.push(state_tensor, action_idx, reward, next_state_tensor)
+            if self.population is not None:
+                self.population.pending_updates += 1
+            else:
+                self.pending_updates += 1
         
         # Epsilon Decay
         if self.epsilon > config.EPSILON_MIN:
             self.epsilon *= config.EPSILON_DECAY
 
+    def train(self):
+        """Runs the optimizer steps due under TRAIN_EVERY / GRADIENT_STEPS. Returns steps taken."""
+        if not self.pending_updates: return 0 # Nothing new stored (and an officer that never acted keeps its brain unbuilt)
+        steps, self.pending_updates = scheduled_steps(self.pending_updates, len(self.memory))
+        return sum(self.optimize_model() for _ in range(steps))
+
     def optimize_model(self):
+        """Runs one gradient step. Returns False if there is not enough memory yet."""
         if len(self.memory) < config.BATCH_SIZE:
-            return
+            return False
             
-        transitions = random.sample(self.memory, config.BATCH_SIZE)
-        batch = Transition(*zip(*transitions))
-
-        # Compute a mask of non-final states
-        non_final_mask = torch.tensor(tuple(map(lambda s: s is not None, batch.next_state)), device=self.device, dtype=torch.bool)
-        
-        valid_next_states = [s for s in batch.next_state if s is not None]
-        non_final_next_states = torch.stack(valid_next_states) if len(valid_next_states) > 0 else None
-        
-        state_batch = torch.stack(batch.state)
-        action_batch = torch.cat(batch.action)
-        reward_batch = torch.cat(batch.reward)
+        state_batch, action_batch, reward_batch, next_state_batch, non_final_mask = self.memory.sample(config.BATCH_SIZE)
 
         # Compute Q(s, a)
         state_action_values = self.policy_net(state_batch).gather(1, action_batch)
 
-        # Compute V(s_{t+1}) for all next states.
-        next_state_values = torch.zeros(config.BATCH_SIZE, device=self.device)
-        
-        if non_final_next_states is not None:
-            next_state_values[non_final_mask] = self.target_net(non_final_next_states).max(1)[0].detach()
+        # Compute V(s_{t+1}) for all next states (0 for terminal transitions).
+        with torch.no_grad():
+            next_state_values = self.target_net(next_state_batch).max(1)[0] * non_final_mask
             
         # Compute the expected Q values
         expected_state_action_values = (next_state_values * config.GAMMA) + reward_batch
@@ -191,6 +235,7 @@ class CorruptCop:
         self.steps_done += 1
         if self.steps_done % config.TARGET_UPDATE_FREQ == 0:
             self.target_net.load_state_dict(self.policy_net.state_dict())
+        return True
 
     def update_stats(self, outcome, offer, current_episode=0):
         """Updates internal stats and corruption score."""
@@ -217,20 +262,30 @@ class CorruptCop:
             self.times_caught += 1
             self.last_caught_episode = current_episode
 
-    def save_brain(self):
-        """Saves Neural Network Weights to disk."""
-        if not os.path.exists(config.BRAIN_DIR):
-            os.makedirs(config.BRAIN_DIR)
-            
-        filename = os.path.join(config.BRAIN_DIR, f"cop_{self.agent_id}.pth")
-        torch.save({
+    def brain_checkpoint(self):
+        """In-memory copy of this officer's brain: what save_brain() writes and a successor can inherit."""
+        if self.population is not None:
+            self.population.sync_agent(self)
+        return snapshot({
             'model_state_dict': self.policy_net.state_dict(),
             'optimizer_state_dict': self.optimizer.state_dict(),
             'epsilon': self.epsilon
-        }, filename)
+        })
+
+    def save_brain(self, writer=None):
+        """Saves Neural Network Weights to disk (in the background when given a CheckpointWriter)."""
+        if self.shared_brain is not None:
+            return # Population network is saved once by SharedCopBrain.save_brain()
+        filename = os.path.join(config.BRAIN_DIR, f"cop_{self.agent_id}.pth")
+        if writer is not None:
+            writer.submit(filename, self.brain_checkpoint())
+        else:
+            atomic_save(self.brain_checkpoint(), filename)
 
     def load_brain(self):
         """Loads Neural Network from disk if it exists."""
+        if self.shared_brain is not None:
+            return
         filename = os.path.join(config.BRAIN_DIR, f"cop_{self.agent_id}.pth")
         if os.path.exists(filename):
             try:
@@ -245,19 +300,21 @@ class CorruptCop:
                 # print(f"Error loading brain for {self.name}: {e}")
                 pass 
 
-    def inherit_brain(self, source_file_path):
-        if os.path.exists(source_file_path):
+    def inherit_brain(self, source):
+        """Takes over a predecessor's weights: a brain_checkpoint() dict, or the path of a saved brain."""
+        if isinstance(source, dict) or os.path.exists(source):
             try:
-                checkpoint = torch.load(source_file_path)
+                checkpoint = source if isinstance(source, dict) else torch.load(source)
                 self.policy_net.load_state_dict(checkpoint['model_state_dict'])
                 self.target_net.load_state_dict(self.policy_net.state_dict())
                 self.epsilon = max(checkpoint.get('epsilon', 1.0), 0.1) 
-                print(f"🧠 {self.name} inherited Neural Pathways from {os.path.basename(source_file_path)}")
+                if config.VERBOSE and not isinstance(source, dict): print(f"🧠 {self.name} inherited Neural Pathways from {os.path.basename(source)}")
             except Exception as e:
-                print(f"⚠️ Brain Compatible Error: {e}")
-                print("✨ Starting with fresh brain...")
-        else:
-            print(f"⚠️ Failed to inherit brain: {source_file_path} not found")
+                if config.VERBOSE:
+                    print(f"⚠️ Brain Compatible Error: {e}")
+                    print("✨ Starting with fresh brain...")
+        elif config.VERBOSE:
+            print(f"⚠️ Failed to inherit brain: {source} not found")
 
     def __repr__(self):
         return f"CorruptCop(#{self.agent_id}, {self.personality}, C:{self.corruption_score:.1f}, ε:{self.epsilon:.2f}, RPG)"
@@ -0,0 +1,93 @@
+import math
+import numpy as np
+import torch
+
+STATE_DIM = 14
+# Officer fields feeding the 4 memory features (registry columns, see agents/registry.py)
+MEMORY_FIELDS = ('times_caught', 'total_money_earned', 'last_caught_episode', 'corruption_score', 'paranoia_level')
+
+# Fallbacks get_state_vector() uses for optional scenario keys
+SCENARIO_DEFAULTS = {
+    'witnesses': 0, 'ia_nearby': False, 'offer': 0, 'severity': 1, 'alert_level': 0.0, 'evidence_strength': 0.5,
+    'has_warrant': False, 'gang_affiliated': False, 'seized_value': 0, 'suspect_aggression': 0.1,
+}
+
+class StateFeaturizer:
+    """
+    Vectorized CorruptCop.get_state_vector(): columnar scenarios plus the acting officers' memory
+    fields -> an (N, 14) float32 tensor, computed column by column straight into a reusable buffer.
+    The returned tensor is a view of that buffer and is overwritten by the next call; clone rows you keep.
+    featurize_one() is the single-decision version for per-officer paths, written into one buffer row.
+    """
+    def __init__(self, capacity=1024, device=None):
+        self.device = device or torch.device("cpu")
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.buffer = torch.empty((capacity, STATE_DIM), dtype=torch.float32)
+        self.out = self.buffer.numpy() # Shares memory with self.buffer
+        self.rows = list(self.buffer) # Per-row views for featurize_one()
+
+    def featurize(self, scenarios, memory, current_episode, rows=None):
+        """
+        scenarios: dict of columns as produced by SimulationEnvironment.generate_batch() (optionally
+        restricted to `rows`); memory: dict of MEMORY_FIELDS columns, one entry per output row.
+        """
+        if rows is not None:
+            scenarios = {k: v[rows] for k, v in scenarios.items()}
+        n = len(memory['times_caught'])
+        if n > len(self.buffer):
+            self._allocate(max(n, 2 * len(self.buffer)))
+        out = self.out[:n]
+
+        # --- Scenario features (10) ---
+        np.minimum(np.asarray(scenarios['witnesses']) / 5.0, 1.0, out=out[:, 0])
+        out[:, 1] = scenarios['ia_nearby']
+        np.minimum(np.log10(np.maximum(np.asarray(scenarios['offer'], dtype=np.float64), 1.0)) / 8.0, 1.0, out=out[:, 2])
+        np.divide(scenarios['severity'], 10.0, out=out[:, 3])
+        out[:, 4] = scenarios['alert_level']
+        out[:, 5] = scenarios['evidence_strength']
+        out[:, 6] = scenarios['has_warrant']
+        out[:, 7] = scenarios['gang_affiliated']
+        np.minimum(np.log10(np.maximum(np.asarray(scenarios['seized_value'], dtype=np.float64), 1.0)) / 8.0, 1.0, out=out[:, 8])
+        out[:, 9] = scenarios['suspect_aggression']
+
+        # --- Memory features (4) ---
+        np.minimum(np.asarray(memory['times_caught']) / 5.0, 1.0, out=out[:, 10])
+        np.minimum(np.log10(np.maximum(np.asarray(memory['total_money_earned'], dtype=np.float64), 1.0)) / 8.0, 1.0, out=out[:, 11])
+        np.maximum(1.0 - (current_episode - np.asarray(memory['last_caught_episode'])) / 500.0, 0.0, out=out[:, 12])
+        np.minimum((np.asarray(memory['corruption_score']) + np.asarray(memory['paranoia_level']) * 100) / 200.0, 1.0, out=out[:, 13])
+
+        return self.buffer[:n].to(self.device)
+
+    def featurize_one(self, officer, state, current_episode, row=0):
+        """
+        get_state_vector() for one officer and one scenario dict, in scalar math (cheaper than numpy for a
+        single row) written straight into buffer row `row`: no tensor is allocated. Returns a view of that row,
+        valid until the next call with the same row.
+        """
+        get = state.get
+        self.out[row] = (
+            min(state['witnesses'] / 5.0, 1.0), 1.0 if state['ia_nearby'] else 0.0,
+            min(math.log10(max(1.0, state['offer'])) / 8.0, 1.0), state['severity'] / 10.0,
+            get('alert_level', 0.0), get('evidence_strength', 0.5),
+            1.0 if get('has_warrant') else 0.0, 1.0 if get('gang_affiliated') else 0.0,
+            min(math.log10(max(1.0, get('seized_value', 0))) / 8.0, 1.0), get('suspect_aggression', 0.1),
+            min(officer.times_caught / 5.0, 1.0), min(math.log10(max(1.0, officer.total_money_earned)) / 8.0, 1.0),
+            max(0.0, 1.0 - (current_episode - officer.last_caught_episode) / 500.0),
+            min((officer.corruption_score + officer.paranoia_level * 100) / 200.0, 1.0),
+        )
+        return self.rows[row].to(self.device)
+
+    def featurize_states(self, officers, states, current_episode):
+        """Same for a list of scenario dicts and the officers facing them."""
+        columns = {key: np.array([s.get(key, default) for s in states]) for key, default in SCENARIO_DEFAULTS.items()}
+        return self.featurize(columns, memory_columns(officers), current_episode)
+
+def memory_columns(officers):
+    """MEMORY_FIELDS for a list of officers: one gather per column when they share an AgentRegistry."""
+    registry = getattr(officers[0], 'registry', None) if officers else None
+    if registry is not None and all(getattr(o, 'registry', None) is registry for o in officers):
+        slots = np.fromiter((o.reg_slot for o in officers), dtype=np.int64, count=len(officers))
+        return {name: registry.columns[name][slots] for name in MEMORY_FIELDS}
+    return {name: np.array([getattr(o, name) for o in officers], dtype=np.float64) for name in MEMORY_FIELDS}
@@ -1,5 +1,17 @@
+from agents.registry import AgentRegistry, RegistryField
+
 class HonestCop:
-    def __init__(self, agent_id, name, integrity_score):
+    # Officer state lives in an AgentRegistry row (see agents/registry.py)
+    corruption_score = RegistryField()
+    loyalty_score = RegistryField()
+    times_bribed = RegistryField()
+    times_caught = RegistryField()
+    total_money_earned = RegistryField()
+    CHECKPOINT_FIELDS = ('name', 'integrity_score', 'reports_filed', 'bribes_rejected')
+
+    def __init__(self, agent_id, name, integrity_score, registry=None):
+        self.registry = registry if registry is not None else AgentRegistry(capacity=1) # Private store by default
+        self.reg_slot = self.registry.allocate(self, 'honest')
         self.agent_id = agent_id
         self.name = name
         self.cop_type = 'honest'
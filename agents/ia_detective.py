@@ -1,15 +1,21 @@
-import random
+import math
+import numpy as np
 import torch
 import torch.optim as optim
-from collections import deque, namedtuple
 from agents.dqn_model import DQN
+from agents.replay_buffer import ReplayBuffer, scheduled_steps
+from agents.checkpoint import LazyBrain, snapshot, atomic_save
 import config # CHANGED
 import os
 
-Transition = namedtuple('Transition', ('state', 'action', 'next_state', 'reward'))
+# Verdict codes returned by IADetective.judge_batch() (index into IA_OUTCOMES)
+IA_OUTCOMES = ['IGNORED', 'GUILTY', 'NOT_GUILTY']
+IA_IGNORED, IA_GUILTY, IA_NOT_GUILTY = range(3)
 
-class IADetective:
-    def __init__(self, agent_id):
+class IADetective(LazyBrain):
+    CHECKPOINT_FIELDS = ('epsilon', 'cases_solved', 'cases_failed', 'money_spent', 'pending_updates')
+
+    def __init__(self, agent_id, load=True):
         self.agent_id = agent_id
         self.name = "Det_Holmes_AI"
         self.cop_type = 'detective'
@@ -20,16 +26,9 @@ class IADetective:
         self.output_dim = config.IA_ACTION_DIM
         self.device = torch.device("cpu")
         
-        self.policy_net = DQN(self.input_dim, self.output_dim, config.HIDDEN_DIM).to(self.device)
-        self.target_net = DQN(self.input_dim, self.output_dim, config.HIDDEN_DIM).to(self.device)
-        self.target_net.load_state_dict(self.policy_net.state_dict())
-        self.target_net.eval()
-        
-        self.optimizer = optim.Adam(self.policy_net.parameters(), lr=config.ALPHA)
-        self.memory = deque(maxlen=config.MEMORY_SIZE)
-        
         self.epsilon = config.EPSILON_START
         self.steps_done = 0
+        self.pending_updates = 0 # Transitions stored since the last training call
         
         self.last_state = None
         self.last_action = None
@@ -38,8 +37,20 @@ class IADetective:
         self.cases_solved = 0
         self.cases_failed = 0
         self.money_spent = 0
+        # Exploration and state noise; the engine swaps in seeded streams (see environment/rng.py)
+        self.rng = np.random.default_rng()
+        self.noise_rng = self.rng
         
-        self.load_brain()
+        self.defer_brain(load) # Networks are built (and loaded) on first use, see build_brain()
+
+    def build_brain(self):
+        self.policy_net = DQN(self.input_dim, self.output_dim, config.HIDDEN_DIM).to(self.device)
+        self.target_net = DQN(self.input_dim, self.output_dim, config.HIDDEN_DIM).to(self.device)
+        self.target_net.load_state_dict(self.policy_net.state_dict())
+        self.target_net.eval()
+        
+        self.optimizer = optim.Adam(self.policy_net.parameters(), lr=config.ALPHA)
+        self.memory = ReplayBuffer(config.MEMORY_SIZE, self.input_dim, self.device)
 
     def get_state_vector(self, cop_data, global_alert):
         """
@@ -47,7 +58,7 @@ class IADetective:
         """
         # Suspicion Estimate (Noisy)
         real_corruption = cop_data.get('corruption_score', 0)
-        noisy_suspicion = min((real_corruption + random.uniform(-10, 10)) / 100.0, 1.0)
+        noisy_suspicion = min((real_corruption + self.noise_rng.uniform(-10, 10)) / 100.0, 1.0)
         
         # Wealth Visible
         wealth_norm = min(cop_data.get('total_money_earned', 0) / 200000.0, 1.0)
@@ -60,15 +71,15 @@ class IADetective:
             wealth_norm,
             caught_norm,
             global_alert,
-            random.random() # Random noise to preventing deterministic loops
+            self.noise_rng.random() # Random noise to preventing deterministic loops
         ], dtype=torch.float32).to(self.device)
 
     def decide_action(self, cop_data, global_alert):
         state_tensor = self.get_state_vector(cop_data, global_alert)
         self.last_state = state_tensor
         
-        if random.random() < self.epsilon:
-            action_idx = random.randint(0, self.output_dim - 1)
+        if self.rng.random() < self.epsilon:
+            action_idx = int(self.rng.integers(self.output_dim))
         else:
             with torch.no_grad():
                 q_values = self.policy_net(state_tensor.unsqueeze(0))
@@ -101,30 +112,87 @@ class IADetective:
         
         return 'NOT_GUILTY', 0
 
-    def learn(self, reward):
-        if self.last_state is None or self.last_action is None: return
+    def get_state_batch(self, corruption, wealth, caught, global_alert):
+        """Vectorized get_state_vector() for N officers (NumPy columns). Returns an (N, 5) tensor."""
+        n = len(corruption)
+        states = np.empty((n, self.input_dim), dtype=np.float32)
+        np.minimum((corruption + self.noise_rng.uniform(-10, 10, n)) / 100.0, 1.0, out=states[:, 0])
+        np.minimum(wealth / 200000.0, 1.0, out=states[:, 1])
+        np.minimum(caught / 10.0, 1.0, out=states[:, 2])
+        states[:, 3] = global_alert
+        states[:, 4] = self.noise_rng.random(n)
+        return torch.from_numpy(states).to(self.device)
+
+    def decide_actions(self, states):
+        """Epsilon-greedy actions for a whole batch of states in one forward pass. Returns (N,) action indices."""
+        with torch.no_grad():
+            greedy = self.policy_net(states).argmax(dim=1).cpu().numpy()
+        explore = self.rng.random(len(greedy)) < self.epsilon
+        return np.where(explore, self.rng.integers(0, self.output_dim, len(greedy)), greedy)
+
+    def judge_batch(self, actions, corruption):
+        """
+        Vectorized execute_logic(). Returns (outcomes, rewards) arrays; outcomes index IA_OUTCOMES.
+        """
+        sent = actions == config.IA_ACTIONS_NAMES.index('SEND_TO_CHIEF')
+        guilty = corruption > 50
+        outcomes = np.where(sent, np.where(guilty, IA_GUILTY, IA_NOT_GUILTY), IA_IGNORED)
+        rewards = np.where(sent, np.where(guilty, 100, -50), np.where(corruption > 60, -20, 5)).astype(np.float32)
+        self.cases_solved += int((sent & guilty).sum())
+        self.cases_failed += int((sent & ~guilty).sum())
+        return outcomes, rewards
+
+    def sweep(self, corruption, wealth, caught, global_alert, train=True):
+        """
+        Inspects N officers at once: one forward pass, vectorized verdicts, all N transitions stored,
+        then (unless train=False) a single optimizer step over max(BATCH_SIZE, N) samples.
+        Returns (actions, outcomes, rewards, gradient_steps).
+        """
+        states = self.get_state_batch(corruption, wealth, caught, global_alert)
+        actions = self.decide_actions(states)
+        outcomes, rewards = self.judge_batch(actions, corruption)
+        self.memory.push_batch(states, torch.from_numpy(actions), torch.from_numpy(rewards))
+
+        if self.epsilon > config.EPSILON_MIN: # Same decay as N learn() calls
+            due = math.ceil(math.log(config.EPSILON_MIN / self.epsilon) / math.log(config.EPSILON_DECAY))
+            self.epsilon *= config.EPSILON_DECAY ** min(len(actions), due)
+
+        steps = 0
+        if train:
+            self.pending_updates = 0
+            if len(self.memory) >= max(config.LEARNING_STARTS, config.BATCH_SIZE):
+                steps = int(self.optimize_model(max(config.BATCH_SIZE, len(actions))))
+        else:
+            self.pending_updates += len(actions)
+        return actions, outcomes, rewards, steps
+
+    def learn(self, reward, train=True):
+        """Stores the transition and (unless train=False) trains on schedule. Returns gradient steps taken."""
+        if self.last_state is None or self.last_action is None: return 0
 
-        action_tensor = torch.tensor([[self.last_action]], device=self.device)
-        reward_tensor = torch.tensor([reward], device=self.device)
         # Next state is not really applicable in this turn-based checking, use None or current
         next_state_tensor = None 
 
-        self.memory.append(Transition(self.last_state, action_tensor, next_state_tensor, reward_tensor))
-        self.optimize_model()
+        self.memory.push(self.last_state, self.last_action, reward, next_state_tensor)
+        self.pending_updates += 1
+        trained = self.train() if train else 0
         
         if self.epsilon > config.EPSILON_MIN:
             self.epsilon *= config.EPSILON_DECAY
+        return trained
+
+    def train(self):
+        """Runs the optimizer steps due under TRAIN_EVERY / GRADIENT_STEPS. Returns steps taken."""
+        steps, self.pending_updates = scheduled_steps(self.pending_updates, len(self.memory))
+        return sum(self.optimize_model() for _ in range(steps))
 
-    def optimize_model(self):
-        if len(self.memory) < config.BATCH_SIZE: return
-        transitions = random.sample(self.memory, config.BATCH_SIZE)
-        batch = Transition(*zip(*transitions))
+    def optimize_model(self, batch_size=None):
+        """Runs one gradient step. Returns False if there is not enough memory yet."""
+        if len(self.memory) < config.BATCH_SIZE: return False
         
         # Simplified optimization (since next_state often None/Irrelevant for immediate classification tasks)
         # But we keep standard DQN structure
-        state_batch = torch.stack(batch.state)
-        action_batch = torch.cat(batch.action)
-        reward_batch = torch.cat(batch.reward)
+        state_batch, action_batch, reward_batch, _, _ = self.memory.sample(batch_size or config.BATCH_SIZE)
         
         state_action_values = self.policy_net(state_batch).gather(1, action_batch)
         expected_state_action_values = reward_batch # direct reward learning for now as steps are independent
@@ -135,10 +203,13 @@ class IADetective:
         self.optimizer.zero_grad()
         loss.backward()
         self.optimizer.step()
+        return True
 
-    def save_brain(self):
-        if not os.path.exists(config.BRAIN_DIR): os.makedirs(config.BRAIN_DIR)
-        torch.save(self.policy_net.state_dict(), os.path.join(config.BRAIN_DIR, "ia_brain.pth"))
+    def save_brain(self, writer=None):
+        checkpoint = snapshot(self.policy_net.state_dict())
+        path = os.path.join(config.BRAIN_DIR, "ia_brain.pth")
+        if writer is not None: writer.submit(path, checkpoint)
+        else: atomic_save(checkpoint, path)
 
     def load_brain(self):
         p = os.path.join(config.BRAIN_DIR, "ia_brain.pth")
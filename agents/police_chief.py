@@ -1,15 +1,16 @@
-import random
+import numpy as np
 import torch
 import torch.optim as optim
-from collections import deque, namedtuple
 from agents.dqn_model import DQN
+from agents.replay_buffer import ReplayBuffer, scheduled_steps
+from agents.checkpoint import LazyBrain, snapshot, atomic_save
 import config
 import os
 
-Transition = namedtuple('Transition', ('state', 'action', 'next_state', 'reward'))
+class PoliceChief(LazyBrain):
+    CHECKPOINT_FIELDS = ('epsilon', 'executions', 'pending_updates', 'total_money_earned')
 
-class PoliceChief:
-    def __init__(self, agent_id):
+    def __init__(self, agent_id, load=True):
         self.agent_id = agent_id
         self.name = "Chief_AI"
         self.cop_type = 'chief'
@@ -20,22 +21,26 @@ class PoliceChief:
         self.output_dim = config.CHIEF_ACTION_DIM
         self.device = torch.device("cpu")
         
-        self.policy_net = DQN(self.input_dim, self.output_dim, config.HIDDEN_DIM).to(self.device)
-        self.target_net = DQN(self.input_dim, self.output_dim, config.HIDDEN_DIM).to(self.device)
-        self.target_net.load_state_dict(self.policy_net.state_dict())
-        self.target_net.eval()
-        
-        self.optimizer = optim.Adam(self.policy_net.parameters(), lr=config.ALPHA)
-        self.memory = deque(maxlen=config.MEMORY_SIZE)
-        
         self.epsilon = config.EPSILON_START
         self.steps_done = 0
+        self.pending_updates = 0 # Transitions stored since the last training call
         
         self.last_state = None
         self.last_action = None
         
         self.executions = 0
-        self.load_brain()
+        self.total_money_earned = 0.0 # Kickbacks from constables
+        self.rng = np.random.default_rng() # Exploration (the engine swaps in a seeded stream, see environment/rng.py)
+        self.defer_brain(load) # Networks are built (and loaded) on first use, see build_brain()
+
+    def build_brain(self):
+        self.policy_net = DQN(self.input_dim, self.output_dim, config.HIDDEN_DIM).to(self.device)
+        self.target_net = DQN(self.input_dim, self.output_dim, config.HIDDEN_DIM).to(self.device)
+        self.target_net.load_state_dict(self.policy_net.state_dict())
+        self.target_net.eval()
+        
+        self.optimizer = optim.Adam(self.policy_net.parameters(), lr=config.ALPHA)
+        self.memory = ReplayBuffer(config.MEMORY_SIZE, self.input_dim, self.device)
 
     def get_state_vector(self, investigation_outcome, cop_data, global_corruption=50.0):
         """
@@ -73,8 +78,8 @@ class PoliceChief:
         state_tensor = self.get_state_vector(investigation_outcome, cop_data, global_corruption)
         self.last_state = state_tensor
         
-        if random.random() < self.epsilon:
-            action_idx = random.randint(0, self.output_dim - 1)
+        if self.rng.random() < self.epsilon:
+            action_idx = int(self.rng.integers(self.output_dim))
         else:
             with torch.no_grad():
                 q_values = self.policy_net(state_tensor.unsqueeze(0))
@@ -120,32 +125,35 @@ class PoliceChief:
             
         return reward
 
-    def learn(self, reward):
-        if self.last_state is None or self.last_action is None: return
+    def learn(self, reward, train=True):
+        """Stores the transition and (unless train=False) trains on schedule. Returns gradient steps taken."""
+        if self.last_state is None or self.last_action is None: return 0
 
         # DEBUG LOGGING
-        global_corr = self.last_state[4].item() * 100  # Extract global corruption from state
-        action_name = config.CHIEF_ACTIONS_NAMES[self.last_action]
-        print(f"[CHIEF] Corr={global_corr:.1f}% | Action={action_name} | Reward={reward:.0f}")
+        if config.VERBOSE:
+            global_corr = self.last_state[4].item() * 100  # Extract global corruption from state
+            action_name = config.CHIEF_ACTIONS_NAMES[self.last_action]
+            print(f"[CHIEF] Corr={global_corr:.1f}% | Action={action_name} | Reward={reward:.0f}")
 
-        action_tensor = torch.tensor([[self.last_action]], device=self.device)
-        reward_tensor = torch.tensor([reward], device=self.device)
         next_state_tensor = None 
 
-        self.memory.append(Transition(self.last_state, action_tensor, next_state_tensor, reward_tensor))
-        self.optimize_model()
+        self.memory.push(self.last_state, self.last_action, reward, next_state_tensor)
+        self.pending_updates += 1
+        trained = self.train() if train else 0
         
         if self.epsilon > config.EPSILON_MIN:
             self.epsilon *= config.EPSILON_DECAY
+        return trained
+
+    def train(self):
+        """Runs the optimizer steps due under TRAIN_EVERY / GRADIENT_STEPS. Returns steps taken."""
+        steps, self.pending_updates = scheduled_steps(self.pending_updates, len(self.memory))
+        return sum(self.optimize_model() for _ in range(steps))
 
     def optimize_model(self):
-        if len(self.memory) < config.BATCH_SIZE: return
-        transitions = random.sample(self.memory, config.BATCH_SIZE)
-        batch = Transition(*zip(*transitions))
-        
-        state_batch = torch.stack(batch.state)
-        action_batch = torch.cat(batch.action)
-        reward_batch = torch.cat(batch.reward)
+        """Runs one gradient step. Returns False if there is not enough memory yet."""
+        if len(self.memory) < config.BATCH_SIZE: return False
+        state_batch, action_batch, reward_batch, _, _ = self.memory.sample(config.BATCH_SIZE)
         
         state_action_values = self.policy_net(state_batch).gather(1, action_batch)
         expected_state_action_values = reward_batch 
@@ -155,10 +163,13 @@ class PoliceChief:
         self.optimizer.zero_grad()
         loss.backward()
         self.optimizer.step()
+        return True
 
-    def save_brain(self):
-        if not os.path.exists(config.BRAIN_DIR): os.makedirs(config.BRAIN_DIR)
-        torch.save(self.policy_net.state_dict(), os.path.join(config.BRAIN_DIR, "chief_brain.pth"))
+    def save_brain(self, writer=None):
+        checkpoint = snapshot(self.policy_net.state_dict())
+        path = os.path.join(config.BRAIN_DIR, "chief_brain.pth")
+        if writer is not None: writer.submit(path, checkpoint)
+        else: atomic_save(checkpoint, path)
 
     def load_brain(self):
         p = os.path.join(config.BRAIN_DIR, "chief_brain.pth")
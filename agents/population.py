@@ -0,0 +1,167 @@
+import torch
+from torch.func import functional_call, stack_module_state, vmap
+from agents.dqn_model import DQN
+from agents.replay_buffer import ReplayBuffer, scheduled_steps
+import config
+
+ADAM_BETAS = (0.9, 0.999)
+ADAM_EPS = 1e-8
+
+class CopPopulation:
+    """
+    Independent CorruptCop brains evaluated and trained together.
+    The parameters of every officer's DQN are stacked into batched tensors and run with
+    torch.func.vmap/functional_call, so one forward/backward costs one batched matmul per layer.
+    Adam is applied to the stacked tensors with per-officer step counts, which is the same
+    update each officer's own optimizer would make. sync_to_agents() writes everything back so
+    the per-officer cop_{id}.pth files keep working.
+    """
+    def __init__(self, cops):
+        self.cops = list(cops)
+        self.device = torch.device("cpu")
+        self.input_dim = 14
+        self.output_dim = config.ACTION_DIM
+
+        # Stateless template module; real weights live in the stacked dicts below
+        self.base = DQN(self.input_dim, self.output_dim, config.HIDDEN_DIM).to('meta')
+        params, _ = stack_module_state([cop.policy_net for cop in self.cops])
+        target, _ = stack_module_state([cop.target_net for cop in self.cops])
+        self.params = {k: v.detach().clone().requires_grad_() for k, v in params.items()}
+        self.target = {k: v.detach().clone() for k, v in target.items()}
+        # Per-row views of the stacked weights for single decisions; training updates them in place
+        with torch.no_grad():
+            self.row_params = [{k: v[i] for k, v in self.params.items()} for i in range(len(self.cops))]
+
+        # Stacked Adam state, seeded from each officer's own optimizer
+        n = len(self.cops)
+        self.exp_avg = {k: torch.zeros_like(v) for k, v in self.params.items()}
+        self.exp_avg_sq = {k: torch.zeros_like(v) for k, v in self.params.items()}
+        self.adam_steps = torch.zeros(n, device=self.device)
+        self.steps_done = torch.zeros(n, dtype=torch.long, device=self.device)
+        self.pending_updates = 0 # Transitions stored (by any officer) since the last training call
+
+        # Population-wide replay storage; every officer's memory becomes a view into it
+        self.storage = ReplayBuffer.allocate((n, config.MEMORY_SIZE), self.input_dim, self.device)
+        for i, cop in enumerate(self.cops):
+            self._adopt(i, cop, keep_optimizer=True)
+
+        self._q = vmap(self._forward)
+
+    def _forward(self, params, x):
+        return functional_call(self.base, params, (x,))
+
+    def _adopt(self, i, cop, keep_optimizer):
+        """Copies an officer's networks, optimizer state and memory into row i."""
+        with torch.no_grad():
+            for name, p in cop.policy_net.named_parameters():
+                self.params[name][i].copy_(p)
+            for name, p in cop.target_net.named_parameters():
+                self.target[name][i].copy_(p)
+
+            opt_state = cop.optimizer.state_dict()['state'] if keep_optimizer else {}
+            for j, name in enumerate(self.params):
+                state = opt_state.get(j)
+                self.exp_avg[name][i].copy_(state['exp_avg'] if state else 0)
+                self.exp_avg_sq[name][i].copy_(state['exp_avg_sq'] if state else 0)
+                if j == 0:
+                    self.adam_steps[i] = float(state['step']) if state else 0.0
+            self.steps_done[i] = cop.steps_done
+
+        view = {field: tensor[i] for field, tensor in self.storage.items()}
+        memory = ReplayBuffer(config.MEMORY_SIZE, self.input_dim, self.device, storage=view)
+        memory.copy_from(cop.memory)
+        cop.memory = memory
+        cop.population = self
+        cop.population_row = i
+
+    def replace(self, old_cop, new_cop):
+        """A successor takes over the dead officer's row (fresh optimizer state, inherited weights)."""
+        i = old_cop.population_row
+        old_cop.population = old_cop.population_row = None
+        self.cops[i] = new_cop
+        self._adopt(i, new_cop, keep_optimizer=False)
+
+    def q_single(self, cop, state_tensor):
+        with torch.no_grad():
+            return self._forward(self.row_params[cop.population_row], state_tensor.unsqueeze(0))
+
+    def optimize_model(self):
+        """One gradient step for every officer with enough memory. Returns how many officers were trained."""
+        sizes = torch.tensor([len(cop.memory) for cop in self.cops], device=self.device)
+        ready = sizes >= config.BATCH_SIZE
+        if not ready.any():
+            return 0
+
+        # Per-officer minibatch: (A, B) indices into each officer's own ring
+        rows = torch.arange(len(self.cops), device=self.device).unsqueeze(1)
+        idx = (torch.rand(len(self.cops), config.BATCH_SIZE, device=self.device) * sizes.clamp(min=1).unsqueeze(1)).long()
+        s = self.storage
+        state_batch, action_batch = s['states'][rows, idx], s['actions'][rows, idx]
+        reward_batch, next_state_batch, non_final = s['rewards'][rows, idx], s['next_states'][rows, idx], s['non_final'][rows, idx]
+
+        state_action_values = self._q(self.params, state_batch).gather(2, action_batch)
+        with torch.no_grad():
+            next_state_values = self._q(self.target, next_state_batch).max(2)[0] * non_final
+        expected = (next_state_values * config.GAMMA + reward_batch).unsqueeze(2)
+
+        # Mean Huber loss per officer, summed: each officer's gradient equals its solo gradient
+        loss = torch.nn.functional.smooth_l1_loss(state_action_values, expected, reduction='none').mean(dim=(1, 2))
+        grads = torch.autograd.grad((loss * ready).sum(), list(self.params.values()))
+
+        with torch.no_grad():
+            self.adam_steps += ready
+            b1, b2 = ADAM_BETAS
+            t = self.adam_steps.clamp(min=1)
+            for (name, p), g in zip(self.params.items(), grads):
+                g = g.clamp(-1, 1) # Gradient Clipping
+                shape = (-1,) + (1,) * (p.dim() - 1)
+                mask = ready.view(shape)
+                m = torch.where(mask, b1 * self.exp_avg[name] + (1 - b1) * g, self.exp_avg[name])
+                v = torch.where(mask, b2 * self.exp_avg_sq[name] + (1 - b2) * g * g, self.exp_avg_sq[name])
+                self.exp_avg[name], self.exp_avg_sq[name] = m, v
+                step_size = (config.ALPHA / (1 - b1 ** t)).view(shape)
+                denom = (v.sqrt() / (1 - b2 ** t).sqrt().view(shape)) + ADAM_EPS
+                p.sub_(torch.where(mask, step_size * m / denom, torch.zeros_like(p)))
+
+            # Update Target Networks periodically (per officer)
+            self.steps_done += ready
+            refresh = ready & (self.steps_done % config.TARGET_UPDATE_FREQ == 0)
+            if refresh.any():
+                for name in self.target:
+                    self.target[name][refresh] = self.params[name][refresh]
+        return int(ready.sum())
+
+    def train(self):
+        """Runs the population steps due under TRAIN_EVERY / GRADIENT_STEPS. Returns officer updates made."""
+        largest = max(len(cop.memory) for cop in self.cops)
+        steps, self.pending_updates = scheduled_steps(self.pending_updates, largest)
+        return sum(self.optimize_model() for _ in range(steps))
+
+    def sync_agent(self, cop):
+        """Writes one officer's stacked weights and Adam state back into its own modules."""
+        i = cop.population_row
+        with torch.no_grad():
+            for name, p in cop.policy_net.named_parameters():
+                p.copy_(self.params[name][i])
+            for name, p in cop.target_net.named_parameters():
+                p.copy_(self.target[name][i])
+            cop.optimizer.load_state_dict({
+                'state': {
+                    j: {'step': self.adam_steps[i].clone(), 'exp_avg': self.exp_avg[name][i].clone(), 'exp_avg_sq': self.exp_avg_sq[name][i].clone()}
+                    for j, name in enumerate(self.params)
+                } if self.adam_steps[i] > 0 else {},
+                'param_groups': cop.optimizer.state_dict()['param_groups']
+            })
+            cop.steps_done = int(self.steps_done[i])
+
+    def sync_to_agents(self):
+        for cop in self.cops:
+            self.sync_agent(cop)
+
+    def save_brains(self, writer=None):
+        """Saves every officer to its usual cop_{id}.pth file."""
+        for cop in self.cops:
+            cop.save_brain(writer) # Syncs its own row first
+
+    def __repr__(self):
+        return f"CopPopulation({len(self.cops)} independent brains)"
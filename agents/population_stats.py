@@ -0,0 +1,46 @@
+from collections import Counter
+
+class PopulationStats:
+    """
+    Running sums over the roster so department-wide averages cost O(1) per episode.
+    CorruptCop's corruption_score / total_money_earned setters report their deltas here,
+    which covers update_stats(), kickbacks and anything else that assigns them.
+    """
+    def __init__(self):
+        self.type_counts = Counter()
+        self.corruption_sum = 0.0
+        self.wealth_sum = 0.0
+
+    def add(self, agent):
+        self.type_counts[agent.cop_type] += 1
+        if agent.cop_type == 'corrupt':
+            agent.stats = self
+            self.corruption_sum += agent.corruption_score
+            self.wealth_sum += agent.total_money_earned
+
+    def remove(self, agent):
+        self.type_counts[agent.cop_type] -= 1
+        if agent.cop_type == 'corrupt':
+            agent.stats = None
+            self.corruption_sum -= agent.corruption_score
+            self.wealth_sum -= agent.total_money_earned
+
+    def rebuild(self, agents):
+        """Recounts from scratch (engine start/reset; also clears any float drift)."""
+        self.type_counts.clear()
+        self.corruption_sum = 0.0
+        self.wealth_sum = 0.0
+        for agent in agents:
+            self.add(agent)
+
+    @property
+    def num_corrupt(self):
+        return self.type_counts['corrupt']
+
+    @property
+    def avg_corruption(self):
+        return self.corruption_sum / self.num_corrupt if self.num_corrupt else 0
+
+    @property
+    def avg_wealth(self):
+        return self.wealth_sum / self.num_corrupt if self.num_corrupt else 0
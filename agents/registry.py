@@ -0,0 +1,112 @@
+import numpy as np
+
+KIND_EMPTY, KIND_CORRUPT, KIND_HONEST = 0, 1, 2
+KINDS = {'corrupt': KIND_CORRUPT, 'honest': KIND_HONEST}
+
+class AgentRegistry:
+    """
+    Struct-of-arrays store for constable state: one NumPy column per field, one row (slot) per officer.
+    CorruptCop/HonestCop attributes listed in FIELDS are RegistryField views onto their slot, so
+    per-officer code is unchanged while department-wide code can read whole columns at once.
+    Slots of executed officers are recycled; `kind` marks which rows are live.
+    """
+    FIELDS = {
+        'corruption_score': (np.float64, 0.0),
+        'paranoia_level': (np.float64, 0.0),
+        'loyalty_score': (np.float64, 100.0),
+        'times_bribed': (np.int64, 0),
+        'times_caught': (np.int64, 0),
+        'total_money_earned': (np.float64, 0.0),
+        'last_caught_episode': (np.int64, -100),
+    }
+
+    def __init__(self, capacity=16):
+        self.capacity = max(1, capacity)
+        self.columns = {name: np.full(self.capacity, default, dtype=dtype) for name, (dtype, default) in self.FIELDS.items()}
+        self.kind = np.zeros(self.capacity, dtype=np.int8)
+        self.agents = [None] * self.capacity
+        self.free = []
+        self.size = 0 # High-water mark of allocated slots
+
+    def _grow(self):
+        extra = self.capacity
+        for name, (dtype, default) in self.FIELDS.items():
+            self.columns[name] = np.concatenate([self.columns[name], np.full(extra, default, dtype=dtype)])
+        self.kind = np.concatenate([self.kind, np.zeros(extra, dtype=np.int8)])
+        self.agents.extend([None] * extra)
+        self.capacity += extra
+
+    def allocate(self, agent, cop_type):
+        """Claims a slot for an agent (initialised to the field defaults). Returns the slot."""
+        if self.free:
+            slot = self.free.pop()
+        else:
+            if self.size == self.capacity: self._grow()
+            slot = self.size
+            self.size += 1
+        for name, (_, default) in self.FIELDS.items():
+            self.columns[name][slot] = default
+        self.kind[slot] = KINDS[cop_type]
+        self.agents[slot] = agent
+        return slot
+
+    def release(self, slot):
+        self.kind[slot] = KIND_EMPTY
+        self.agents[slot] = None
+        self.free.append(slot)
+
+    def layout(self):
+        """Allocation state beyond the rows themselves (checkpointed so a restore recycles slots in the same order)."""
+        return {'size': self.size, 'free': list(self.free)}
+
+    def relocate(self, slots, layout):
+        """Moves live officers to saved slots ({agent: slot}) and restores a layout(), e.g. after a checkpoint restore."""
+        while self.capacity < layout['size']: self._grow()
+        old_columns = {name: col.copy() for name, col in self.columns.items()}
+        old_kind = self.kind.copy()
+        self.kind[:] = KIND_EMPTY
+        self.agents = [None] * self.capacity
+        for agent, slot in slots.items():
+            for name, col in self.columns.items():
+                col[slot] = old_columns[name][agent.reg_slot]
+            self.kind[slot] = old_kind[agent.reg_slot]
+            self.agents[slot] = agent
+        for agent, slot in slots.items():
+            agent.reg_slot = slot
+        self.size, self.free = layout['size'], list(layout['free'])
+
+    def active_slots(self, cop_type=None):
+        live = self.kind[:self.size]
+        mask = live != KIND_EMPTY if cop_type is None else live == KINDS[cop_type]
+        return np.flatnonzero(mask)
+
+    def column(self, name, cop_type=None):
+        """Values of one field for every live officer (optionally of one type), in slot order."""
+        return self.columns[name][self.active_slots(cop_type)]
+
+    def row(self, slot):
+        """One officer's fields as a dict of Python scalars (e.g. the IA's cop_data)."""
+        return {name: col.item(slot) for name, col in self.columns.items()}
+
+class RegistryField:
+    """
+    Attribute view onto an AgentRegistry column (expects `registry` and `reg_slot` on the instance).
+    Reads return Python scalars. If `stat_sum` is given, writes also report the delta to the
+    instance's PopulationStats (see agents/population_stats.py).
+    """
+    def __init__(self, stat_sum=None):
+        self.stat_sum = stat_sum
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, owner=None):
+        if obj is None: return self
+        return obj.registry.columns[self.name].item(obj.reg_slot)
+
+    def __set__(self, obj, value):
+        column = obj.registry.columns[self.name]
+        if self.stat_sum and obj.stats is not None:
+            stats = obj.stats
+            setattr(stats, self.stat_sum, getattr(stats, self.stat_sum) + value - column.item(obj.reg_slot))
+        column[obj.reg_slot] = value
@@ -0,0 +1,119 @@
+import torch
+import config
+
+class ReplayBuffer:
+    """
+    Fixed-size replay memory backed by preallocated contiguous tensors.
+    Writes go to a ring position; sampling is a single index gather.
+    """
+    FIELDS = ('states', 'actions', 'rewards', 'next_states', 'non_final')
+
+    def __init__(self, capacity, state_dim, device=torch.device("cpu"), storage=None):
+        """storage: optional dict of preallocated tensors (e.g. views into a population-wide buffer)."""
+        self.capacity = capacity
+        self.state_dim = state_dim
+        self.device = device
+
+        if storage is None:
+            storage = self.allocate((capacity,), state_dim, device)
+        self.states = storage['states']
+        self.actions = storage['actions']
+        self.rewards = storage['rewards']
+        self.next_states = storage['next_states']
+        self.non_final = storage['non_final'] # False = terminal (no next state)
+
+        self.position = 0 # Next write slot
+        self.size = 0
+
+    @staticmethod
+    def allocate(shape, state_dim, device=torch.device("cpu")):
+        """Zeroed storage tensors with leading dims `shape` (capacity last)."""
+        return {
+            'states': torch.zeros((*shape, state_dim), dtype=torch.float32, device=device),
+            'actions': torch.zeros((*shape, 1), dtype=torch.long, device=device),
+            'rewards': torch.zeros(shape, dtype=torch.float32, device=device),
+            'next_states': torch.zeros((*shape, state_dim), dtype=torch.float32, device=device),
+            'non_final': torch.zeros(shape, dtype=torch.bool, device=device)
+        }
+
+    def copy_from(self, other):
+        """Copies the contents and write pointer of another buffer of the same capacity."""
+        for field in self.FIELDS:
+            getattr(self, field).copy_(getattr(other, field))
+        self.position = other.position
+        self.size = other.size
+
+    def state_dict(self):
+        """Filled part of the buffer plus the write pointer (slots past `size` were never written)."""
+        state = {field: getattr(self, field)[:self.size] for field in self.FIELDS}
+        state.update(position=self.position, size=self.size)
+        return state
+
+    def load_state_dict(self, state):
+        n = min(state['size'], self.capacity)
+        for field in self.FIELDS:
+            getattr(self, field)[:n] = state[field][:n]
+        self.position = state['position'] % self.capacity
+        self.size = n
+
+    def __len__(self):
+        return self.size
+
+    def push(self, state, action, reward, next_state=None):
+        """Stores one transition. next_state=None marks a terminal transition."""
+        i = self.position
+        self.states[i] = state
+        self.actions[i, 0] = action
+        self.rewards[i] = reward
+        if next_state is None:
+            self.non_final[i] = False
+        else:
+            self.next_states[i] = next_state
+            self.non_final[i] = True
+
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def push_batch(self, states, actions, rewards, next_states=None, non_final=None):
+        """Stores N transitions with one indexed write per field (wraps around the ring). No next_states = all terminal."""
+        n = len(states)
+        if n > self.capacity: # Only the newest `capacity` would survive anyway
+            keep = slice(n - self.capacity, n)
+            states, actions, rewards = states[keep], actions[keep], rewards[keep]
+            if next_states is not None: next_states, non_final = next_states[keep], non_final[keep]
+            n = self.capacity
+        idx = (torch.arange(n, device=self.device) + self.position) % self.capacity
+        self.states[idx] = states
+        self.actions[idx, 0] = torch.as_tensor(actions, dtype=torch.long, device=self.device)
+        self.rewards[idx] = torch.as_tensor(rewards, dtype=torch.float32, device=self.device)
+        if next_states is None:
+            self.non_final[idx] = False
+        else:
+            self.next_states[idx] = next_states
+            self.non_final[idx] = torch.as_tensor(non_final, dtype=torch.bool, device=self.device)
+
+        self.position = (self.position + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def sample_indices(self, batch_size):
+        return torch.randint(0, self.size, (batch_size,), device=self.device)
+
+    def gather(self, idx):
+        """Returns (states, actions, rewards, next_states, non_final_mask) at the given indices."""
+        return self.states[idx], self.actions[idx], self.rewards[idx], self.next_states[idx], self.non_final[idx]
+
+    def sample(self, batch_size):
+        """Returns (states, actions, rewards, next_states, non_final_mask) for a random batch."""
+        return self.gather(self.sample_indices(batch_size))
+
+def scheduled_steps(pending, memory_size):
+    """
+    Training cadence shared by all learners.
+    Given the transitions stored since the last training call, returns
+    (optimizer steps due now, pending transitions carried over).
+    Nothing trains (and nothing accumulates) until LEARNING_STARTS transitions are stored.
+    """
+    if memory_size < max(config.LEARNING_STARTS, config.BATCH_SIZE):
+        return 0, 0
+    calls, leftover = divmod(pending, config.TRAIN_EVERY)
+    return calls * config.GRADIENT_STEPS, leftover
@@ -0,0 +1,150 @@
+import os
+import torch
+import torch.nn as nn
+import torch.optim as optim
+from agents.dqn_model import DQN
+from agents.featurizer import StateFeaturizer
+from agents.replay_buffer import ReplayBuffer, scheduled_steps
+from agents.checkpoint import snapshot, atomic_save
+import config
+
+class SharedDQN(nn.Module):
+    """DQN whose input is the 14-dim cop state plus a learned per-officer identity embedding."""
+    def __init__(self, input_dim, output_dim, num_slots, embed_dim, hidden_dim=64):
+        super(SharedDQN, self).__init__()
+        self.identity = nn.Embedding(num_slots, embed_dim)
+        self.body = DQN(input_dim + embed_dim, output_dim, hidden_dim)
+
+    def forward(self, x, slots):
+        return self.body(torch.cat([x, self.identity(slots)], dim=1))
+
+class SharedCopBrain:
+    """
+    One policy network shared by the whole corrupt-cop population.
+    Each officer owns an identity slot (embedding row); a successor takes over
+    the slot of the officer it replaces, which is how brain inheritance works here.
+    """
+    def __init__(self, num_slots=None, load=True):
+        self.input_dim = 14
+        self.output_dim = config.ACTION_DIM
+        self.num_slots = num_slots or max(config.SHARED_BRAIN_SLOTS, config.NUM_CORRUPT_COPS)
+        self.device = torch.device("cpu")
+
+        self.policy_net = SharedDQN(self.input_dim, self.output_dim, self.num_slots, config.COP_EMBED_DIM, config.HIDDEN_DIM).to(self.device)
+        self.target_net = SharedDQN(self.input_dim, self.output_dim, self.num_slots, config.COP_EMBED_DIM, config.HIDDEN_DIM).to(self.device)
+        self.target_net.load_state_dict(self.policy_net.state_dict())
+        self.target_net.eval()
+
+        self.optimizer = optim.Adam(self.policy_net.parameters(), lr=config.ALPHA)
+        self.memory = ReplayBuffer(config.MEMORY_SIZE, self.input_dim, self.device)
+        self.memory_slots = torch.zeros(config.MEMORY_SIZE, dtype=torch.long, device=self.device) # Slot of each stored transition
+        self.steps_done = 0
+        self.pending_updates = 0 # Transitions stored since the last training call
+        self.featurizer = StateFeaturizer(self.num_slots, self.device)
+
+        self.free_slots = list(range(self.num_slots - 1, -1, -1))
+        self.owners = {} # slot -> agent_id
+        self.saved_slots = {} # agent_id -> slot, from the last saved brain (resume)
+        if load: self.load_brain()
+
+    def allocate_slot(self, agent_id):
+        """Gives an officer an identity slot, reusing the one it had when the brain was saved."""
+        slot = self.saved_slots.get(agent_id)
+        if slot is None or slot not in self.free_slots:
+            if not self.free_slots:
+                raise RuntimeError(f"Shared cop brain is full ({self.num_slots} slots). Raise SHARED_BRAIN_SLOTS.")
+            slot = self.free_slots[-1]
+        self.free_slots.remove(slot)
+        self.owners[slot] = agent_id
+        return slot
+
+    def transfer_slot(self, slot, agent_id):
+        """Hands a slot (and so the learned identity) to a successor officer."""
+        self.owners[slot] = agent_id
+
+    def release_slot(self, slot):
+        self.owners.pop(slot, None)
+        self.free_slots.append(slot)
+
+    def act(self, states, slots, epsilons):
+        """
+        Epsilon-greedy actions for N officers in one forward pass.
+        states: (N, 14), slots: (N,) long, epsilons: (N,) float. Returns (N,) long action indices.
+        """
+        with torch.no_grad():
+            greedy = self.policy_net(states, slots).argmax(dim=1)
+        explore = torch.rand(len(slots), device=self.device) < epsilons
+        random_actions = torch.randint(0, self.output_dim, (len(slots),), device=self.device)
+        return torch.where(explore, random_actions, greedy)
+
+    def decide_bribes(self, cops, states, current_episode=0):
+        """Batched CorruptCop.decide_bribe() for many officers sharing this brain."""
+        state_batch = self.featurizer.featurize_states(cops, states, current_episode).clone() # Rows are kept as last_state
+        slots = torch.tensor([cop.slot for cop in cops], dtype=torch.long, device=self.device)
+        epsilons = torch.tensor([cop.epsilon for cop in cops], dtype=torch.float32, device=self.device)
+        actions = self.act(state_batch, slots, epsilons).tolist()
+        for cop, state_tensor, action_idx in zip(cops, state_batch, actions):
+            cop.last_state = state_tensor
+            cop.last_action = action_idx
+        return [config.ACTIONS[a] for a in actions]
+
+    def push(self, slot, state, action, reward, next_state=None):
+        self.memory_slots[self.memory.position] = slot
+        self.memory.push(state, action, reward, next_state)
+        self.pending_updates += 1
+
+    def train(self):
+        """Runs the optimizer steps due under TRAIN_EVERY / GRADIENT_STEPS. Returns steps taken."""
+        steps, self.pending_updates = scheduled_steps(self.pending_updates, len(self.memory))
+        return sum(self.optimize_model() for _ in range(steps))
+
+    def optimize_model(self):
+        """Runs one gradient step on the shared network. Returns False if there is not enough memory yet."""
+        if len(self.memory) < config.BATCH_SIZE:
+            return False
+
+        idx = self.memory.sample_indices(config.BATCH_SIZE)
+        state_batch, action_batch, reward_batch, next_state_batch, non_final_mask = self.memory.gather(idx)
+        slot_batch = self.memory_slots[idx]
+
+        state_action_values = self.policy_net(state_batch, slot_batch).gather(1, action_batch)
+        with torch.no_grad():
+            next_state_values = self.target_net(next_state_batch, slot_batch).max(1)[0] * non_final_mask
+        expected_state_action_values = (next_state_values * config.GAMMA) + reward_batch
+
+        loss = nn.SmoothL1Loss()(state_action_values, expected_state_action_values.unsqueeze(1))
+
+        self.optimizer.zero_grad()
+        loss.backward()
+        for param in self.policy_net.parameters():
+            param.grad.data.clamp_(-1, 1) # Gradient Clipping
+        self.optimizer.step()
+
+        self.steps_done += 1
+        if self.steps_done % config.TARGET_UPDATE_FREQ == 0:
+            self.target_net.load_state_dict(self.policy_net.state_dict())
+        return True
+
+    def save_brain(self, writer=None):
+        checkpoint = snapshot({
+            'model_state_dict': self.policy_net.state_dict(),
+            'optimizer_state_dict': self.optimizer.state_dict(),
+            'slots': {agent_id: slot for slot, agent_id in self.owners.items()}
+        })
+        path = os.path.join(config.BRAIN_DIR, "shared_cops.pth")
+        if writer is not None: writer.submit(path, checkpoint)
+        else: atomic_save(checkpoint, path)
+
+    def load_brain(self):
+        p = os.path.join(config.BRAIN_DIR, "shared_cops.pth")
+        if os.path.exists(p):
+            try:
+                checkpoint = torch.load(p)
+                self.policy_net.load_state_dict(checkpoint['model_state_dict'])
+                self.target_net.load_state_dict(self.policy_net.state_dict())
+                self.optimizer.load_state_dict(checkpoint['optimizer_state_dict'])
+                self.saved_slots = checkpoint.get('slots', {})
+            except: pass # Slot count changed or incompatible file: start fresh
+
+    def __repr__(self):
+        return f"SharedCopBrain(slots:{self.num_slots - len(self.free_slots)}/{self.num_slots})"
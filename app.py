@@ -1,9 +1,10 @@
-from flask import Flask, render_template, request
+from flask import Flask, render_template, request, jsonify
 from flask_socketio import SocketIO, emit
 import threading
 import time
 import os
-from simulation_engine import SimulationEngine
+from visualization.delta_encoder import RosterDeltaEncoder
+from database.history import load_history
 import config # For dynamic settings updates
 from config import SEASON_LENGTH
 
@@ -11,40 +12,142 @@ app = Flask(__name__)
 app.config['SECRET_KEY'] = 'secret!'
 socketio = SocketIO(app, async_mode='threading')
 
-# Initialize Engine
-engine = SimulationEngine()
+# Engine is built on first use (or by the warm-up task): importing it loads torch and every agent,
+# which would otherwise hold up the web server's cold start
+engine = None
+engine_lock = threading.Lock()
+warming_up = False
 thread = None
 thread_lock = threading.Lock()
 is_running = False
 is_resetting = False
 
+# 'delta' protocol: roster sent once, then only changed values as packed arrays
+encoder = RosterDeltaEncoder() if config.UI_PROTOCOL == 'delta' else None
+
+# Events (log lines) coalesced between UI frames; state comes from engine.snapshot() at emit time
+pending_lock = threading.Lock()
+pending_events = {'logs': [], 'hierarchy_logs': [], 'steps': 0}
+
+# Backpressure: each client acknowledges every frame once rendered; until it does, its frames are dropped.
+# sid -> {'sent_at': monotonic time of the unacknowledged frame or None, 'stale': missed a delta frame}
+clients_lock = threading.Lock()
+clients = {}
+frames_dropped = 0
+
+def get_engine():
+    global engine
+    if engine is None:
+        with engine_lock:
+            if engine is None:
+                from simulation_engine import SimulationEngine
+                engine = SimulationEngine()
+    return engine
+
+def send_initial_state(send):
+    """Recent history, roster and status for newly connected clients (send: emit or socketio.emit)."""
+    try:
+        rows = engine.db.fetch_all("SELECT episode, corruption_level, avg_wealth, chief_wealth FROM episode_stats ORDER BY episode DESC LIMIT 200")
+        if rows:
+            # Reverse to chronological order
+            rows.reverse()
+            history = [{'episode': r[0], 'corruption': r[1], 'avg_wealth': r[2], 'chief_wealth': r[3]} for r in rows]
+            send('init_history', history)
+    except Exception as e:
+        print(f"History fetch error: {e}")
+        
+    if encoder: send('roster', encoder.full())
+    send('status_update', {'status': 'Connected', 'episode': engine.global_episodes})
+
+def warm_up():
+    """Builds the engine off the request path (first client connect), then greets the clients waiting for it."""
+    get_engine()
+    send_initial_state(socketio.emit)
+
+def coalesce(step_data):
+    """Folds one step's events into the next frame, keeping only the newest lines."""
+    with pending_lock:
+        pending_events['steps'] += 1
+        if step_data['log']:
+            pending_events['logs'].append(step_data['log'])
+            del pending_events['logs'][:-config.UI_MAX_LOGS]
+        if step_data['hierarchy_logs']:
+            pending_events['hierarchy_logs'].extend(step_data['hierarchy_logs'])
+            del pending_events['hierarchy_logs'][:-config.UI_MAX_LOGS]
+
+def take_frame():
+    """Latest engine snapshot plus everything coalesced since the last frame (None if nothing happened)."""
+    with pending_lock:
+        if not pending_events['steps']:
+            return None
+        events = dict(pending_events)
+        pending_events.update(logs=[], hierarchy_logs=[], steps=0)
+    frame = get_engine().snapshot()
+    if encoder: frame['delta'] = encoder.encode(frame.pop('agents'))
+    frame['steps'] = events['steps']
+    frame['logs'] = events['logs']
+    frame['log'] = events['logs'][-1] if events['logs'] else ""
+    frame['hierarchy_logs'] = events['hierarchy_logs']
+    return frame
+
+def acknowledge(sid):
+    with clients_lock:
+        if sid in clients: clients[sid]['sent_at'] = None
+
+def send_frame(frame):
+    """
+    Sends a frame to every client that acknowledged its previous one; the rest skip it. A client that
+    skipped a delta frame first gets the full roster again; so does one whose ack has not come within UI_ACK_TIMEOUT_S.
+    """
+    global frames_dropped
+    now = time.monotonic()
+    with clients_lock:
+        ready = []
+        for sid, client in clients.items():
+            sent_at = client['sent_at']
+            if sent_at is not None and now - sent_at < config.UI_ACK_TIMEOUT_S:
+                client['stale'] = True
+                frames_dropped += 1
+                continue
+            ready.append((sid, client['stale'] or sent_at is not None))
+            client.update(sent_at=now, stale=False)
+    for sid, stale in ready:
+        if stale and encoder: socketio.emit('roster', encoder.full(), to=sid) # Already includes this frame's changes
+        socketio.emit('update_data', frame, to=sid, callback=lambda *_, sid=sid: acknowledge(sid))
+
+def emitter_thread():
+    """Sends at most UI_EMIT_HZ frames/sec; steps in between are merged, and a client still busy with its last frame skips the next."""
+    interval = 1.0 / config.UI_EMIT_HZ
+    while is_running:
+        socketio.sleep(interval)
+        frame = take_frame()
+        if frame: send_frame(frame)
+    frame = take_frame() # Flush the tail
+    if frame and not is_resetting: send_frame(frame)
+
 def background_thread():
-    """Runs the simulation loop."""
+    """Runs the simulation loop, free-running; the emitter thread handles the UI."""
     global is_running
     print("Background thread started")
+    engine = get_engine()
+    socketio.start_background_task(emitter_thread)
     
     # UNLIMITED MODE: Runs until user presses Stop
     while is_running:
-        step_data = engine.step()
+        with engine.lock:
+            step_data = engine.step()
         
-        if step_data:  # Only emit if there's data (may be None in turbo mode)
-            socketio.emit('update_data', step_data)
-        
-        # Dynamic delay based on turbo mode
-        if engine.turbo_mode:
-            time.sleep(0.001)  # 1ms - nearly instant for max speed
-        else:
-            time.sleep(0.1)    # 100ms - smooth visualization
-        
-        if not step_data and not engine.turbo_mode:
-            # Only stop on None if not in turbo mode
+        if not step_data:  # No agents left
             is_running = False
             break
+        coalesce(step_data)
+        socketio.sleep(0) # Yield to socket handlers (Stop/Reset)
             
     # Stop reached
     # CRITICAL FIX: Do NOT save state if we are resetting (resetting wipes files)
     if not is_resetting:
-        engine.save_state()
+        with engine.lock:
+            engine.save_state()
         socketio.emit('status_update', {'status': 'Stopped'})
     else:
         print("Reset triggered: Skipping save_state cleanup.")
@@ -53,20 +156,30 @@ def background_thread():
 def index():
     return render_template('index.html')
 
+@app.route('/api/history')
+def history():
+    # Whole run, downsampled to at most ?points= points (results modal)
+    points = max(3, request.args.get('points', config.UI_HISTORY_POINTS, type=int))
+    return jsonify(load_history(get_engine().db, points))
+
 @socketio.on('connect')
 def test_connect():
-    # Send recent history to populate graphs on refresh
-    try:
-        rows = engine.db.fetch_all("SELECT episode, corruption_level, avg_wealth, chief_wealth FROM episode_stats ORDER BY episode DESC LIMIT 200")
-        if rows:
-            # Reverse to chronological order
-            rows.reverse()
-            history = [{'episode': r[0], 'corruption': r[1], 'avg_wealth': r[2], 'chief_wealth': r[3]} for r in rows]
-            emit('init_history', history)
-    except Exception as e:
-        print(f"History fetch error: {e}")
-        
-    emit('status_update', {'status': 'Connected', 'episode': engine.global_episodes})
+    # Send recent history to populate graphs on refresh (warm_up() does it once the engine is ready)
+    global warming_up
+    with clients_lock:
+        clients[request.sid] = {'sent_at': None, 'stale': False}
+    if engine is None:
+        if not warming_up:
+            warming_up = True
+            socketio.start_background_task(warm_up)
+        emit('status_update', {'status': 'Loading simulation...'})
+        return
+    send_initial_state(emit)
+
+@socketio.on('disconnect')
+def on_disconnect():
+    with clients_lock:
+        clients.pop(request.sid, None)
 
 @socketio.on('start_simulation')
 def start_simulation():
@@ -104,20 +217,26 @@ def reset_simulation():
 
     # Wipe files (Best Effort)
     print("🧹 WIPING MEMORY...")
+    engine = get_engine()
     try:
-        # Delete database
+        # Delete database (stop the telemetry writer and close pooled connections first; WAL mode keeps -wal/-shm side files)
+        engine.telemetry.close()
+        engine.checkpoints.discard()
+        engine.db.close()
         if os.path.exists(config.DB_PATH): 
             try: 
                 os.remove(config.DB_PATH)
+                for suffix in ('-wal', '-shm'):
+                    if os.path.exists(config.DB_PATH + suffix): os.remove(config.DB_PATH + suffix)
                 print(f"✓ Deleted database: {config.DB_PATH}")
             except Exception as e: 
                 print(f"✗ Failed to delete DB: {e}")
         
         # Delete training state
-        state_file = os.path.join(config.PROJECT_ROOT, 'training_state.json')
-        if os.path.exists(state_file): 
-            os.remove(state_file)
-            print(f"✓ Deleted training state")
+        for state_file in (config.STATE_FILE, config.CHECKPOINT_FILE):
+            if os.path.exists(state_file): 
+                os.remove(state_file)
+                print(f"✓ Deleted training state: {os.path.basename(state_file)}")
         
         # Delete ALL brain files using absolute path
         import glob
@@ -138,7 +257,9 @@ def reset_simulation():
         print(f"Error resetting files: {e}")
 
     # Engine Reset (The Authority)
-    engine.reset()
+    with engine.lock:
+        engine.reset()
+    if encoder: encoder.reset()
     is_resetting = False
     is_running = False
     emit('status_update', {'status': f'Reset Complete - Wiped {deleted_count} brain files', 'episode': 0})
@@ -147,7 +268,9 @@ def reset_simulation():
 @socketio.on('execute_agent')
 def on_execute_agent(data):
     agent_id = int(data.get('id', -1))
-    success, msg = engine.execute_agent(agent_id)
+    engine = get_engine()
+    with engine.lock:
+        success, msg = engine.execute_agent(agent_id)
     if success:
         emit('status_update', {'status': f"Executed Officer {agent_id}"})
     else:
@@ -188,7 +311,7 @@ def on_toggle_turbo(data):
     Data format: {'enabled': true/false}
     """
     enabled = data.get('enabled', False)
-    engine.set_turbo_mode(enabled)
+    get_engine().set_turbo_mode(enabled)
     mode_text = "TURBO (Max Speed)" if enabled else "NORMAL (Visualization)"
     print(f"🚀 MODE CHANGE: {mode_text}")
     emit('status_update', {'status': f"Mode: {mode_text}", 'turbo': enabled})
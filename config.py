@@ -5,6 +5,33 @@ PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(PROJECT_ROOT, 'corruption.db')
 RESULTS_DIR = os.path.join(PROJECT_ROOT, 'results')
 BRAIN_DIR = os.path.join(PROJECT_ROOT, 'brains')
+STATE_FILE = os.path.join(PROJECT_ROOT, 'training_state.json')
+AUTOSAVE_EVERY = 0  # Checkpoint brains + training state every N episodes, written in the background (0 = only on stop)
+CHECKPOINT_FORMAT = 'department'  # 'department': one memory-mappable CHECKPOINT_FILE; 'files': per-agent .pth + STATE_FILE
+CHECKPOINT_FILE = os.path.join(BRAIN_DIR, 'department.ckpt')
+CHECKPOINT_REPLAY = False  # Also store replay buffers in the department checkpoint
+SEED = None  # Run seed for every RNG stream (see environment/rng.py); None = fresh random seed. A resumed run keeps its saved seed
+
+# Telemetry write-behind queue (episode_stats, investigations, bribe_history, cops)
+TELEMETRY_FLUSH_ROWS = 500     # Flush once this many rows are buffered...
+TELEMETRY_FLUSH_MS = 250       # ...or this long after the last flush
+TELEMETRY_QUEUE_SIZE = 100000  # Producers block only if the writer falls this far behind
+BRIBE_LOG_SAMPLE_RATE = 10     # Log every decision step of 1 in N episodes to bribe_history (0 = off)
+
+# Columnar export (python -m database.exporter)
+EXPORT_DIR = os.path.join(RESULTS_DIR, 'export')
+EXPORT_PARTITION_EPISODES = 10000  # Episodes per exported file
+EXPORT_CHUNK_ROWS = 50000          # Rows fetched from SQLite per round trip
+
+# Console logging (turned off by the headless trainer)
+VERBOSE = True
+
+# Dashboard streaming
+UI_EMIT_HZ = 10    # Max update frames per second sent to the browser
+UI_ACK_TIMEOUT_S = 2.0  # A client that has not acknowledged its last frame for this long gets frames again
+UI_MAX_LOGS = 20   # Newest log lines kept per frame (older ones between frames are dropped)
+UI_PROTOCOL = 'delta'  # 'delta': roster once, then changed values as packed arrays; 'json': full agents list every frame
+UI_HISTORY_POINTS = 1000  # Max points /api/history returns for a whole run (LTTB over episode_rollups)
 
 # Agent Counts
 NUM_CORRUPT_COPS = 5
@@ -14,7 +41,10 @@ TOTAL_AGENTS = 1 + 1 + NUM_CORRUPT_COPS + NUM_HONEST_COPS  # Chief + IA + Corrup
 # Simulation Parameters
 SEASON_LENGTH = 5000 
 INSPECTION_FREQUENCY = 10  # IA checks periodically, not every episode (realistic)
+INSPECTION_SWEEP = False   # IA audits many officers per inspection in one batched pass (see run_inspection_sweep)
+INSPECTION_SWEEP_SIZE = 0  # Officers audited per sweep (0 = whole roster)
 ALERT_DECAY_RATE = 0.05
+SCENARIO_BATCH_SIZE = 1024  # Scenarios pre-rolled per generate_batch() call
 
 # Risk Factors - CORRUPTION-FRIENDLY DEFAULTS
 WITNESS_RISK_FACTOR = 0.01       # 1% chance (was 0.05 = 5%)
@@ -38,6 +68,27 @@ MEMORY_SIZE = 10000
 HIDDEN_DIM = 64  # Reduced from 128 for faster computation
 TARGET_UPDATE_FREQ = 200  # Increased from 100 to reduce overhead
 
+# Training Cadence (decoupled from environment steps)
+TRAIN_EVERY = 1            # Stored transitions between training calls
+GRADIENT_STEPS = 1         # Optimizer steps per training call
+LEARNING_STARTS = BATCH_SIZE  # Warmup: transitions stored before the first update
+LEARN_AT_BATCH_END = False    # Engine only stores transitions and trains every LEARN_BATCH_EPISODES
+LEARN_BATCH_EPISODES = 100
+
+# Parallel Rollouts (actor/learner, see parallel_engine.py)
+PARALLEL_WORKERS = 4           # Rollout processes
+PARALLEL_CHUNK_SIZE = 256      # Transition rows per shared-memory chunk
+PARALLEL_CHUNK_EPISODES = 128  # Max episodes a worker packs into one chunk
+PARALLEL_SYNC_EPISODES = 1000  # Episodes between weight syncs to the workers (rounded up to whole chunks)
+
+# Shared Corrupt-Cop Brain (one network for the whole population, see agents/shared_brain.py)
+SHARED_COP_BRAIN = False
+COP_EMBED_DIM = 8  # Per-officer identity embedding size
+SHARED_BRAIN_SLOTS = NUM_CORRUPT_COPS  # Identity slots (successors reuse their predecessor's slot)
+
+# Independent brains trained together with torch.func.vmap (see agents/population.py)
+VMAP_POPULATION = False
+
 # Dimensions
 # Corrupt Cop: 14 Dim (10 RPG + 4 Memory)
 # Chief: 6 Dim (was 5, now includes global_corruption and target_error)
@@ -96,6 +147,11 @@ REWARD_STEAL = 0 # Value based
 REWARD_BRUTALITY = 50 # Satisfaction?
 REWARD_ISOLATE = 20
 
+# Penalties for failed / pointless actions
+REWARD_ARREST_FAILED = -100
+REWARD_DE_ESCALATE_FAILED = -200
+REWARD_INVALID = -50 # Useless tactic or invalid ticket
+
 # Initial Values
 INITIAL_INTEGRITY_HONEST = 90
 INITIAL_CORRUPTION_MIN = 60      
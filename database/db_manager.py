@@ -1,50 +1,174 @@
 import sqlite3
 import os
+import threading
 from contextlib import contextmanager
 
+# Applied to every connection: WAL lets readers (dashboard) run alongside the simulation's writes,
+# synchronous=NORMAL fsyncs at checkpoints instead of every commit (safe with WAL).
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",   # ~16 MB page cache
+    "PRAGMA temp_store=MEMORY",
+)
+STATEMENT_CACHE_SIZE = 256 # Prepared statements kept per connection
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+def _migrate_episode_stats(conn):
+    """v1: episode_stats gets the columns the engine actually writes (episode, corruption_level, avg_wealth, chief_wealth)."""
+    if 'episode' in _columns(conn, 'episode_stats'):
+        return
+    conn.execute("ALTER TABLE episode_stats RENAME TO episode_stats_old")
+    conn.execute("""
+        CREATE TABLE episode_stats (
+            stat_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            episode INTEGER,
+            corruption_level REAL,
+            avg_wealth REAL,
+            chief_wealth REAL
+        )""")
+    conn.execute("INSERT INTO episode_stats (episode, corruption_level) SELECT episode_number, avg_corruption FROM episode_stats_old")
+    conn.execute("DROP TABLE episode_stats_old")
+
+def _add_indexes(conn):
+    """v2: indexes for the history chart, investigation lookups, per-cop bribe history and the resume query."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_episode_stats_episode ON episode_stats(episode)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_investigations_episode_target ON investigations(episode, target_cop_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bribe_history_cop_episode ON bribe_history(cop_id, episode_number)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_cops_status_type ON cops(status, cop_type)")
+
+def _add_bribe_codes(conn):
+    """v3: compact integer codes for sampled per-step bribe_history rows (indexes into config.ACTIONS / Outcome)."""
+    columns = _columns(conn, 'bribe_history')
+    if 'action_code' not in columns:
+        conn.execute("ALTER TABLE bribe_history ADD COLUMN action_code INTEGER")
+    if 'outcome_code' not in columns:
+        conn.execute("ALTER TABLE bribe_history ADD COLUMN outcome_code INTEGER")
+
+ROLLUP_LEVELS = (100, 10000) # Episodes per episode_rollups bucket
+
+def _rollup_upsert(level):
+    return f"""
+        INSERT INTO episode_rollups (level, bucket, n, corruption_sum, corruption_min, corruption_max, wealth_sum, chief_wealth_sum)
+        VALUES ({level}, NEW.episode / {level}, 1, NEW.corruption_level, NEW.corruption_level, NEW.corruption_level, NEW.avg_wealth, NEW.chief_wealth)
+        ON CONFLICT(level, bucket) DO UPDATE SET
+            n = n + 1,
+            corruption_sum = corruption_sum + excluded.corruption_sum,
+            corruption_min = min(corruption_min, excluded.corruption_min),
+            corruption_max = max(corruption_max, excluded.corruption_max),
+            wealth_sum = wealth_sum + excluded.wealth_sum,
+            chief_wealth_sum = chief_wealth_sum + excluded.chief_wealth_sum;"""
+
+def _add_episode_rollups(conn):
+    """v4: per-100 / per-10k episode aggregates, kept current by a trigger on every episode_stats insert."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS episode_rollups (
+            level INTEGER,   -- Episodes per bucket (ROLLUP_LEVELS)
+            bucket INTEGER,  -- episode / level
+            n INTEGER,
+            corruption_sum REAL,
+            corruption_min REAL,
+            corruption_max REAL,
+            wealth_sum REAL,
+            chief_wealth_sum REAL,
+            PRIMARY KEY (level, bucket)
+        )""")
+    conn.execute("DROP TRIGGER IF EXISTS trg_episode_rollups")
+    conn.execute(f"CREATE TRIGGER trg_episode_rollups AFTER INSERT ON episode_stats BEGIN {''.join(_rollup_upsert(level) for level in ROLLUP_LEVELS)} END")
+    # Backfill from whatever is already recorded
+    conn.execute("DELETE FROM episode_rollups")
+    for level in ROLLUP_LEVELS:
+        conn.execute(f"""
+            INSERT INTO episode_rollups
+            SELECT {level}, episode / {level}, COUNT(*), SUM(corruption_level), MIN(corruption_level), MAX(corruption_level), SUM(avg_wealth), SUM(chief_wealth)
+            FROM episode_stats WHERE episode IS NOT NULL GROUP BY episode / {level}""")
+
+def _cover_history_index(conn):
+    """v5: the history reads (episode + chart columns) are answered from the index alone, without touching table rows."""
+    conn.execute("DROP INDEX IF EXISTS idx_episode_stats_episode")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_episode_stats_history ON episode_stats(episode, corruption_level, avg_wealth, chief_wealth)")
+
+# Applied in order; PRAGMA user_version records how many have run. Append only, never reorder.
+MIGRATIONS = [
+    _migrate_episode_stats,
+    _add_indexes,
+    _add_bribe_codes,
+    _add_episode_rollups,
+    _cover_history_index,
+]
+
+BRIBE_LOG_QUERY = """
+    INSERT INTO bribe_history (episode_number, cop_id, action_code, outcome_code, player_offer, witness_count, ia_nearby, location_risk)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
 class DBManager:
     def __init__(self, db_path, schema_path):
         self.db_path = db_path
         self.schema_path = schema_path
+        # One long-lived connection per thread (sqlite3 connections are not shared across threads)
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
         self.initialize_db()
 
     def get_connection(self):
-        return sqlite3.connect(self.db_path)
+        """Returns this thread's persistent connection, opening it on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+            for pragma in CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
 
     def initialize_db(self):
         """Creates the database and tables if they don't exist."""
         # Ensure directory exists
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        
-        with self.get_connection() as conn:
-            with open(self.schema_path, 'r') as f:
-                schema_script = f.read()
-            conn.executescript(schema_script)
-            conn.commit()
+
+        conn = self.get_connection()
+        with open(self.schema_path, 'r') as f:
+            schema_script = f.read()
+        conn.executescript(schema_script)
+        conn.commit()
+        self.migrate()
+
+    def migrate(self):
+        """Runs any migrations newer than the database's user_version, each in its own transaction."""
+        conn = self.get_connection()
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            with conn:
+                conn.execute("BEGIN") # sqlite3 would otherwise autocommit DDL statement by statement
+                migration(conn)
+                conn.execute(f"PRAGMA user_version={number}")
+        return len(MIGRATIONS)
 
     def execute_query(self, query, params=()):
         """Executes a query and commits. Returns cursor for selection."""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            conn.commit()
-            return cursor
+        conn = self.get_connection()
+        with conn:
+            return conn.execute(query, params)
 
     def fetch_one(self, query, params=()):
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            return cursor.fetchone()
+        return self.get_connection().execute(query, params).fetchone()
 
     def fetch_all(self, query, params=()):
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            return cursor.fetchall()
-    
+        return self.get_connection().execute(query, params).fetchall()
+
     def close(self):
-        # SQLite connections in context managers close automatically, but explicit method provided if needed
-        pass
+        """Closes every thread's connection (e.g. before the DB file is deleted). Reconnects lazily."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._local = threading.local()
+        for conn in connections:
+            try: conn.close()
+            except sqlite3.Error: pass
 
     def update_cop_status(self, cop_id, status):
         """Updates the status of a cop (e.g. active, killed, fired)."""
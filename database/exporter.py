@@ -0,0 +1,183 @@
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import struct
+import zipfile
+import numpy as np
+import config
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError: # Optional: fall back to uncompressed .npz
+    pa = pq = None
+
+# Exported tables and the episode column each one is partitioned on
+EXPORT_TABLES = {
+    'episode_stats': 'episode',
+    'investigations': 'episode',
+    'bribe_history': 'episode_number',
+}
+MANIFEST = 'manifest.json'
+
+def _column_types(conn, table):
+    """SQLite declared type -> NumPy dtype. Missing values become -1 (integers), NaN (reals) or '' (text)."""
+    types = {}
+    for _, name, decl, *_ in conn.execute(f"PRAGMA table_info({table})"):
+        decl = (decl or '').upper()
+        if 'INT' in decl or 'BOOL' in decl:
+            types[name] = 'int64'
+        elif 'REAL' in decl or 'FLOA' in decl or 'DOUB' in decl:
+            types[name] = 'float64'
+        else:
+            types[name] = 'str'
+    return types
+
+def _to_columns(rows, types):
+    columns = {}
+    for i, (name, dtype) in enumerate(types.items()):
+        values = [row[i] for row in rows]
+        if dtype == 'int64':
+            columns[name] = np.array([-1 if v is None else v for v in values], dtype=np.int64)
+        elif dtype == 'float64':
+            columns[name] = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        else:
+            columns[name] = np.array(['' if v is None else str(v) for v in values], dtype=str)
+    return columns
+
+def _write_partition(path, columns, fmt):
+    if fmt == 'parquet':
+        pq.write_table(pa.table(columns), path)
+    else:
+        np.savez(path, **columns) # Stored, not deflated, so members can be memory-mapped
+
+def export(db_path=None, out_dir=None, tables=None, partition_episodes=None, chunk_rows=None, fmt=None):
+    """
+    Streams tables out of SQLite into columnar files, one file per episode range:
+    <out_dir>/<table>/episodes_<start>-<end>.parquet (or .npz without pyarrow), plus a manifest.json.
+    Only one partition is held in memory at a time. Returns the manifest.
+    """
+    db_path = db_path or config.DB_PATH
+    out_dir = out_dir or config.EXPORT_DIR
+    tables = tables or list(EXPORT_TABLES)
+    partition_episodes = partition_episodes or config.EXPORT_PARTITION_EPISODES
+    chunk_rows = chunk_rows or config.EXPORT_CHUNK_ROWS
+    fmt = fmt or ('parquet' if pq is not None else 'npz')
+    if fmt == 'parquet' and pq is None:
+        raise ImportError("Parquet export needs pyarrow (pip install pyarrow) - use fmt='npz'.")
+    ext = '.parquet' if fmt == 'parquet' else '.npz'
+
+    manifest = {'format': fmt, 'partition_episodes': partition_episodes, 'tables': {}}
+    conn = sqlite3.connect(db_path)
+    try:
+        for table in tables:
+            episode_col = EXPORT_TABLES[table]
+            types = _column_types(conn, table)
+            table_dir = os.path.join(out_dir, table)
+            shutil.rmtree(table_dir, ignore_errors=True)
+            os.makedirs(table_dir)
+            partitions = []
+
+            def flush(part, rows):
+                start = part * partition_episodes
+                end = start + partition_episodes - 1
+                name = f"episodes_{start:09d}-{end:09d}{ext}"
+                _write_partition(os.path.join(table_dir, name), _to_columns(rows, types), fmt)
+                partitions.append({'file': name, 'start': start, 'end': end, 'rows': len(rows)})
+
+            cursor = conn.execute(f"SELECT {', '.join(types)} FROM {table} WHERE {episode_col} IS NOT NULL ORDER BY {episode_col}")
+            ep_idx = list(types).index(episode_col)
+            part, rows = None, []
+            while True:
+                chunk = cursor.fetchmany(chunk_rows)
+                if not chunk: break
+                for row in chunk:
+                    row_part = row[ep_idx] // partition_episodes
+                    if row_part != part and rows:
+                        flush(part, rows)
+                        rows = []
+                    part = row_part
+                    rows.append(row)
+            if rows: flush(part, rows)
+            manifest['tables'][table] = {'episode_column': episode_col, 'columns': types, 'partitions': partitions}
+    finally:
+        conn.close()
+
+    with open(os.path.join(out_dir, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def load_manifest(export_dir=None):
+    with open(os.path.join(export_dir or config.EXPORT_DIR, MANIFEST)) as f:
+        return json.load(f)
+
+def _npz_member(path, column):
+    """Memory-maps one array inside an uncompressed .npz (np.load would read the whole member)."""
+    with zipfile.ZipFile(path) as zf:
+        info = zf.getinfo(column + '.npy')
+    if info.compress_type != zipfile.ZIP_STORED:
+        with np.load(path) as data:
+            return data[column]
+    with open(path, 'rb') as f:
+        f.seek(info.header_offset)
+        name_len, extra_len = struct.unpack('<HH', f.read(30)[26:30])
+        f.seek(info.header_offset + 30 + name_len + extra_len)
+        version = np.lib.format.read_magic(f)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, fortran, dtype = read_header(f)
+        offset = f.tell()
+    if 0 in shape:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape, order='F' if fortran else 'C')
+
+def _read_partition(path, column, fmt):
+    if fmt == 'parquet':
+        return pq.read_table(path, columns=[column], memory_map=True).column(column).to_numpy()
+    return _npz_member(path, column)
+
+def iter_column(table, column, export_dir=None, start=None, end=None):
+    """Yields one memory-mapped array per partition overlapping [start, end] (no row-level filtering)."""
+    export_dir = export_dir or config.EXPORT_DIR
+    manifest = load_manifest(export_dir)
+    for part in manifest['tables'][table]['partitions']:
+        if (start is not None and part['end'] < start) or (end is not None and part['start'] > end):
+            continue
+        yield _read_partition(os.path.join(export_dir, table, part['file']), column, manifest['format'])
+
+def read_table(table, columns=None, export_dir=None, start=None, end=None):
+    """Returns {column: array} for an exported table, optionally limited to episodes [start, end]."""
+    export_dir = export_dir or config.EXPORT_DIR
+    info = load_manifest(export_dir)['tables'][table]
+    columns = list(columns or info['columns'])
+    wanted = columns if info['episode_column'] in columns else columns + [info['episode_column']]
+    data = {}
+    for col in wanted:
+        parts = list(iter_column(table, col, export_dir, start, end))
+        data[col] = np.concatenate(parts) if parts else np.empty(0, dtype=info['columns'][col])
+    if start is not None or end is not None:
+        episodes = data[info['episode_column']]
+        mask = np.ones(len(episodes), dtype=bool)
+        if start is not None: mask &= episodes >= start
+        if end is not None: mask &= episodes <= end
+        data = {col: arr[mask] for col, arr in data.items()}
+    return {col: data[col] for col in columns}
+
+def main():
+    parser = argparse.ArgumentParser(description="Export run telemetry from SQLite to partitioned columnar files.")
+    parser.add_argument('--db', default=config.DB_PATH, help="SQLite database to read")
+    parser.add_argument('--out', default=config.EXPORT_DIR, help="Output directory")
+    parser.add_argument('--tables', nargs='+', choices=list(EXPORT_TABLES), help="Tables to export (default: all)")
+    parser.add_argument('--partition', type=int, default=config.EXPORT_PARTITION_EPISODES, help="Episodes per file")
+    parser.add_argument('--format', choices=['parquet', 'npz'], help="Default: parquet if pyarrow is installed, else npz")
+    args = parser.parse_args()
+
+    manifest = export(args.db, args.out, args.tables, args.partition, fmt=args.format)
+    for table, info in manifest['tables'].items():
+        rows = sum(p['rows'] for p in info['partitions'])
+        print(f"{table}: {rows} rows in {len(info['partitions'])} {manifest['format']} partitions")
+    print(f"Export written to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import numpy as np
+from database.db_manager import ROLLUP_LEVELS
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling. Returns the indices of at most `threshold`
+    points of (x, y) that best preserve the line's visual shape (first and last always kept).
+    """
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        return np.array([0, n - 1], dtype=np.int64)[:max(threshold, 0)]
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Interior points split into threshold-2 buckets; pick one point per bucket
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Third vertex: the average of the next bucket (or the last point)
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+def load_history(db, points=1000):
+    """
+    The whole run as at most `points` points. Reads the coarsest episode_rollups level that still has
+    at least `points` buckets (raw episode_stats for short runs), then LTTB-downsamples on corruption.
+    Returns columns: episode, corruption, corruption_min, corruption_max, avg_wealth, chief_wealth, plus the source used.
+    """
+    rows, source = None, 'episode_stats'
+    for level in sorted(ROLLUP_LEVELS, reverse=True):
+        if db.fetch_one("SELECT COUNT(*) FROM episode_rollups WHERE level=?", (level,))[0] >= points:
+            rows = db.fetch_all("""
+                SELECT bucket * ?, corruption_sum / n, corruption_min, corruption_max, wealth_sum / n, chief_wealth_sum / n
+                FROM episode_rollups WHERE level=? ORDER BY bucket""", (level, level))
+            source = f"rollup_{level}"
+            break
+    if rows is None:
+        rows = db.fetch_all("""
+            SELECT episode, corruption_level, corruption_level, corruption_level, avg_wealth, chief_wealth
+            FROM episode_stats ORDER BY episode""")
+
+    keys = ('episode', 'corruption', 'corruption_min', 'corruption_max', 'avg_wealth', 'chief_wealth')
+    if not rows:
+        return dict({key: [] for key in keys}, source=source)
+    data = np.array(rows, dtype=np.float64)
+    if len(data) > points:
+        data = data[lttb(data[:, 0], data[:, 1], points)]
+    history = {key: data[:, i].tolist() for i, key in enumerate(keys)}
+    history['episode'] = [int(e) for e in history['episode']]
+    history['source'] = source
+    return history
@@ -75,8 +75,10 @@ CREATE TABLE IF NOT EXISTS orders (
 -- Table 6: Episode Stats (Global Tracking per Episode)
 CREATE TABLE IF NOT EXISTS episode_stats (
     stat_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    episode_number INTEGER,
-    total_bribes_accepted INTEGER,
-    total_caught INTEGER,
-    avg_corruption REAL
+    episode INTEGER,
+    corruption_level REAL, -- Average corruption score of corrupt cops
+    avg_wealth REAL,       -- Average earnings of corrupt cops
+    chief_wealth REAL
 );
+
+-- Indexes and later column changes live in DBManager's versioned migrations (PRAGMA user_version)
@@ -0,0 +1,95 @@
+import queue
+import sqlite3
+import threading
+import time
+import config
+
+class TelemetryWriter:
+    """
+    Write-behind queue for high-volume inserts/updates (episode_stats, investigations, bribe_history, cops).
+    The simulation thread only enqueues; a background thread drains the queue and writes each run of
+    identical statements with executemany, one transaction per flush (every N rows or T milliseconds).
+    """
+    def __init__(self, db, flush_rows=None, flush_ms=None, max_queue=None):
+        self.db = db
+        self.flush_rows = flush_rows or config.TELEMETRY_FLUSH_ROWS
+        self.flush_interval = (flush_ms or config.TELEMETRY_FLUSH_MS) / 1000.0
+        # Bounded: if the disk falls this far behind, producers wait instead of growing memory without limit
+        self.queue = queue.Queue(maxsize=max_queue or config.TELEMETRY_QUEUE_SIZE)
+        self.rows_written = 0
+        self.errors = 0
+        self.last_error = None
+        self._thread = None
+        self._start()
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name="TelemetryWriter", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, query, params=()):
+        """Buffers one statement. Returns immediately unless the queue is full."""
+        if self._thread is None: self._start() # Reopened after close()
+        self.queue.put((query, params))
+
+    def enqueue_many(self, query, rows):
+        for params in rows:
+            self.enqueue(query, params)
+
+    def flush(self, timeout=None):
+        """Blocks until everything enqueued before this call is committed."""
+        if self._thread is None: return True
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """Flushes and stops the writer thread (e.g. before the DB file is deleted)."""
+        if self._thread is None: return
+        self.queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        pending = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = False # Interval elapsed
+
+            if isinstance(item, tuple):
+                pending.append(item)
+                # Flush on size or on the deadline, which a steady stream of rows would otherwise never reach
+                if len(pending) < self.flush_rows and time.monotonic() < deadline:
+                    continue
+
+            try:
+                self._write(pending)
+            except sqlite3.Error as e: # e.g. commit failed on a locked database
+                self.errors += 1
+                self.last_error = e
+            pending = []
+            deadline = time.monotonic() + self.flush_interval
+            if item is None:
+                return
+            if isinstance(item, threading.Event):
+                item.set()
+
+    def _write(self, pending):
+        """Commits buffered statements in one transaction, batching consecutive identical queries."""
+        if not pending: return
+        conn = self.db.get_connection()
+        with conn:
+            start = 0
+            for end in range(1, len(pending) + 1):
+                if end < len(pending) and pending[end][0] == pending[start][0]:
+                    continue
+                try:
+                    conn.executemany(pending[start][0], [params for _, params in pending[start:end]])
+                    self.rows_written += end - start
+                except sqlite3.Error as e:
+                    # A bad statement only drops its own run; telemetry must never take the simulation down
+                    self.errors += 1
+                    self.last_error = e
+                start = end
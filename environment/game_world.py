@@ -1,26 +1,43 @@
-import random
+import numpy as np
 import config # CHANGED
+from environment.outcomes import Outcome
+
+# Action indices into config.ACTIONS (used by the batched resolver)
+A = {name: i for i, name in enumerate(config.ACTIONS)}
+
+# Wealth bands (0-1000 scale) for the 'poor', 'middle' and 'rich' criminal classes
+WEALTH_BANDS = ((10, 100), (100, 500), (500, 1000))
 
 class SimulationEnvironment:
     def __init__(self):
         self.crime_names = list(config.CRIME_TYPES.keys())
+        self.rng = np.random.default_rng()
+
+        # Lookup columns so batches can index crime properties by crime_idx
+        crime_table = np.array([config.CRIME_TYPES[c] for c in self.crime_names], dtype=np.int64)
+        self.crime_severity = crime_table[:, 0]
+        self.crime_val_min = crime_table[:, 1]
+        self.crime_val_max = crime_table[:, 2]
 
     def generate_scenario(self):
         """
-        Generates a rich 10-dim RPG scenario.
+        Generates a rich 10-dim RPG scenario (drawn from self.rng).
         """
-        crime_name = random.choice(self.crime_names)
+        rng = self.rng
+        randint = lambda low, high: int(rng.integers(low, high + 1)) # Inclusive, like random.randint
+        coin = lambda: bool(rng.random() < 0.5)
+        crime_name = self.crime_names[rng.integers(len(self.crime_names))]
         severity, base_val_min, base_val_max = config.CRIME_TYPES[crime_name]
         
         # 1. Asset Value
-        asset_value = random.randint(base_val_min * 10, base_val_max * 10) 
+        asset_value = randint(base_val_min * 10, base_val_max * 10) 
         
         # 2. Criminal Profile & Weath
-        criminal_class = random.choice(['poor', 'middle', 'rich'])
+        criminal_class = ('poor', 'middle', 'rich')[rng.integers(3)]
         # Wealth on 0-1000 scale
-        if criminal_class == 'poor': suspect_wealth_value = random.randint(10, 100)
-        elif criminal_class == 'middle': suspect_wealth_value = random.randint(100, 500)
-        else: suspect_wealth_value = random.randint(500, 1000)
+        if criminal_class == 'poor': suspect_wealth_value = randint(10, 100)
+        elif criminal_class == 'middle': suspect_wealth_value = randint(100, 500)
+        else: suspect_wealth_value = randint(500, 1000)
         
         # 3. Bribe Offer Logic (User Requested)
         if severity <= 3:
@@ -37,15 +54,73 @@ class SimulationEnvironment:
             'crime_type': crime_name,
             'severity': severity,
             'offer': final_offer,
-            'witnesses': random.randint(0, 4),
-            'ia_nearby': random.choice([True, False]),
+            'witnesses': randint(0, 4),
+            'ia_nearby': coin(),
             'alert_level': 0.0, 
-            'evidence_strength': random.uniform(0.1, 1.0),
-            'has_warrant': random.choice([True, False]) if severity > 5 else False,
-            'gang_affiliated': random.choice([True, False]),
-            'seized_value': random.randint(100, 1000) if random.random() < 0.3 else 0,
-            'suspect_aggression': random.uniform(0.1, 1.0) if severity > 6 else 0.1,
-            'location_risk': random.random()
+            'evidence_strength': float(rng.uniform(0.1, 1.0)),
+            'has_warrant': coin() if severity > 5 else False,
+            'gang_affiliated': coin(),
+            'seized_value': randint(100, 1000) if rng.random() < 0.3 else 0,
+            'suspect_aggression': float(rng.uniform(0.1, 1.0)) if severity > 6 else 0.1,
+            'location_risk': float(rng.random())
+        }
+
+    def generate_batch(self, n, rng=None):
+        """
+        Generates N scenarios at once as NumPy columns (one array per feature).
+        Same distributions as generate_scenario(); use scenario_at() to get a dict row.
+        rng: Generator to draw from (default self.rng), e.g. an RNGStreams 'scenarios' stream.
+        """
+        rng = self.rng if rng is None else rng
+        crime_idx = rng.integers(0, len(self.crime_names), n)
+        severity = self.crime_severity[crime_idx]
+
+        # 1. Asset Value (inclusive bounds, like random.randint)
+        asset_value = rng.integers(self.crime_val_min[crime_idx] * 10, self.crime_val_max[crime_idx] * 10 + 1)
+
+        # 2. Criminal Profile & Wealth
+        criminal_class = rng.integers(0, 3, n)
+        bands = np.array(WEALTH_BANDS, dtype=np.int64)
+        suspect_wealth = rng.integers(bands[criminal_class, 0], bands[criminal_class, 1] + 1)
+
+        # 3. Bribe Offer Logic (severity based)
+        raw_offer = np.where(
+            severity <= 3, 0.10 * asset_value,
+            np.where(severity <= 7, np.maximum(0.30 * asset_value, 0.30 * suspect_wealth), 0.50 * suspect_wealth)
+        )
+
+        # 4. RPG Features
+        seized_roll = rng.random(n)
+        return {
+            'crime_idx': crime_idx,
+            'severity': severity,
+            'offer': raw_offer.astype(np.int64),
+            'witnesses': rng.integers(0, 5, n),
+            'ia_nearby': rng.random(n) < 0.5,
+            'alert_level': np.zeros(n),
+            'evidence_strength': rng.uniform(0.1, 1.0, n),
+            'has_warrant': (severity > 5) & (rng.random(n) < 0.5),
+            'gang_affiliated': rng.random(n) < 0.5,
+            'seized_value': np.where(seized_roll < 0.3, rng.integers(100, 1001, n), 0),
+            'suspect_aggression': np.where(severity > 6, rng.uniform(0.1, 1.0, n), 0.1),
+            'location_risk': rng.random(n)
+        }
+
+    def scenario_at(self, batch, i):
+        """Extracts row i of a batch as a regular scenario dict (Python scalars)."""
+        return {
+            'crime_type': self.crime_names[batch['crime_idx'][i]],
+            'severity': int(batch['severity'][i]),
+            'offer': int(batch['offer'][i]),
+            'witnesses': int(batch['witnesses'][i]),
+            'ia_nearby': bool(batch['ia_nearby'][i]),
+            'alert_level': float(batch['alert_level'][i]),
+            'evidence_strength': float(batch['evidence_strength'][i]),
+            'has_warrant': bool(batch['has_warrant'][i]),
+            'gang_affiliated': bool(batch['gang_affiliated'][i]),
+            'seized_value': int(batch['seized_value'][i]),
+            'suspect_aggression': float(batch['suspect_aggression'][i]),
+            'location_risk': float(batch['location_risk'][i])
         }
 
     def resolve_outcome(self, decision, state):
@@ -60,14 +135,14 @@ class SimulationEnvironment:
             # Needs Evidence OR Warrant
             if state['has_warrant'] or state['evidence_strength'] > 0.6:
                 return 'arrest_success'
-            return 'arrest_failed' if random.random() < 0.5 else 'arrest_success'
+            return 'arrest_failed' if self.rng.random() < 0.5 else 'arrest_success'
             
         if decision == 'INVESTIGATE':
             return 'investigate_success' 
             
         if decision == 'DE_ESCALATE':
             if state['suspect_aggression'] > 0.8:
-                return 'severe_injury' if random.random() < 0.2 else 'de_escalate_failed'
+                return 'severe_injury' if self.rng.random() < 0.2 else 'de_escalate_failed'
             return 'de_escalate_success'
             
         if decision == 'ISSUE_TICKET':
@@ -75,7 +150,7 @@ class SimulationEnvironment:
             return 'ticket_success'
             
         if decision == 'REPORT_BRIBE':
-            if state['gang_affiliated'] and random.random() < 0.3:
+            if state['gang_affiliated'] and self.rng.random() < 0.3:
                 return 'severe_injury' 
             return 'report_success'
 
@@ -83,16 +158,16 @@ class SimulationEnvironment:
             return 'warrant_success'
             
         if decision == 'WHISTLEBLOW':
-            return 'severe_injury' if random.random() < 0.6 else 'whistleblow_success'
+            return 'severe_injury' if self.rng.random() < 0.6 else 'whistleblow_success'
 
         # --- CORRUPT ACTIONS ---
         if decision == 'ACCEPT_BRIBE':
             risk = (state['witnesses'] * config.WITNESS_RISK_FACTOR) + (0.5 if state['ia_nearby'] else 0)
-            return 'caught' if random.random() < risk else 'success'
+            return 'caught' if self.rng.random() < risk else 'success'
             
         if decision == 'EXTORT':
             risk = 0.3 + (0.5 if state['ia_nearby'] else 0)
-            return 'caught' if random.random() < risk else 'extortion_success'
+            return 'caught' if self.rng.random() < risk else 'extortion_success'
             
         if decision == 'PLANT_EVIDENCE': # Frame
             if state['witnesses'] > 0 or state['ia_nearby']:
@@ -114,7 +189,7 @@ class SimulationEnvironment:
         if decision == 'STEAL_SEIZED':
             if state['seized_value'] == 0: return 'steal_useless'
             risk = 0.1 if not state['ia_nearby'] else 0.9
-            return 'caught' if random.random() < risk else 'steal_success'
+            return 'caught' if self.rng.random() < risk else 'steal_success'
             
         if decision == 'EXCESSIVE_FORCE':
             return 'caught' if (state['witnesses'] > 0 or state['ia_nearby']) else 'brutality_success'
@@ -131,3 +206,61 @@ class SimulationEnvironment:
 
         # Default / Fallback
         return 'investigate_success'
+
+    def resolve_batch(self, actions, batch):
+        """
+        Batched resolve_outcome(): one NumPy pass over an array of action indices
+        and a columnar scenario batch (see generate_batch).
+        Returns: (outcome_codes, witnesses, suspect_aggression)
+        The ISOLATE_SUSPECT side effects come back as new arrays; the batch is not modified.
+        """
+        actions = np.asarray(actions)
+        n = len(actions)
+        witnesses = batch['witnesses']
+        ia = batch['ia_nearby']
+        gang = batch['gang_affiliated']
+        aggression = batch['suspect_aggression']
+        has_witnesses = witnesses > 0
+
+        # One uniform draw per row covers every stochastic branch (each action rolls at most once)
+        roll = self.rng.random(n)
+
+        accept_risk = witnesses * config.WITNESS_RISK_FACTOR + np.where(ia, 0.5, 0.0)
+        extort_risk = 0.3 + np.where(ia, 0.5, 0.0)
+        steal_risk = np.where(ia, 0.9, 0.1)
+        caught_or = lambda caught, success: np.where(caught, Outcome.CAUGHT, success)
+
+        # Action -> outcome column, evaluated for every row and selected by action index
+        table = {
+            'ARREST': np.where(batch['has_warrant'] | (batch['evidence_strength'] > 0.6) | (roll >= 0.5),
+                               Outcome.ARREST_SUCCESS, Outcome.ARREST_FAILED),
+            'INVESTIGATE': Outcome.INVESTIGATE_SUCCESS,
+            'DE_ESCALATE': np.where(aggression > 0.8,
+                                    np.where(roll < 0.2, Outcome.SEVERE_INJURY, Outcome.DE_ESCALATE_FAILED),
+                                    Outcome.DE_ESCALATE_SUCCESS),
+            'ISSUE_TICKET': np.where(batch['severity'] > 3, Outcome.TICKET_INVALID, Outcome.TICKET_SUCCESS),
+            'REPORT_BRIBE': np.where(gang & (roll < 0.3), Outcome.SEVERE_INJURY, Outcome.REPORT_SUCCESS),
+            'REQUEST_WARRANT': Outcome.WARRANT_SUCCESS,
+            'WHISTLEBLOW': np.where(roll < 0.6, Outcome.SEVERE_INJURY, Outcome.WHISTLEBLOW_SUCCESS),
+            'ACCEPT_BRIBE': caught_or(roll < accept_risk, Outcome.SUCCESS),
+            'EXTORT': caught_or(roll < extort_risk, Outcome.EXTORTION_SUCCESS),
+            'PLANT_EVIDENCE': caught_or(has_witnesses | ia, Outcome.FRAME_SUCCESS),
+            'TIP_OFF': np.where(gang, caught_or(ia, Outcome.TIP_OFF_SUCCESS), Outcome.TIP_OFF_USELESS),
+            'DESTROY_EVIDENCE': caught_or(ia, Outcome.DESTROY_SUCCESS),
+            'INTIMIDATE_WITNESS': np.where(has_witnesses, caught_or(ia, Outcome.INTIMIDATE_SUCCESS), Outcome.INTIMIDATE_USELESS),
+            'STEAL_SEIZED': np.where(batch['seized_value'] > 0, caught_or(roll < steal_risk, Outcome.STEAL_SUCCESS), Outcome.STEAL_USELESS),
+            'EXCESSIVE_FORCE': caught_or(has_witnesses | ia, Outcome.BRUTALITY_SUCCESS),
+            'ISOLATE_SUSPECT': np.where(has_witnesses, Outcome.ISOLATE_SUCCESS, Outcome.ISOLATE_USELESS),
+        }
+
+        # Default / Fallback matches resolve_outcome()
+        outcomes = np.full(n, Outcome.INVESTIGATE_SUCCESS, dtype=np.int64)
+        for name, column in table.items():
+            mask = actions == A[name]
+            outcomes[mask] = np.broadcast_to(column, (n,))[mask]
+
+        # Application of the Maneuver ("Gully" Effect) without touching the batch
+        isolated = outcomes == Outcome.ISOLATE_SUCCESS
+        new_witnesses = np.where(isolated, 0, witnesses)
+        new_aggression = np.where(isolated, np.minimum(1.0, aggression + 0.3), aggression)
+        return outcomes, new_witnesses, new_aggression
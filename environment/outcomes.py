@@ -0,0 +1,101 @@
+from enum import IntEnum
+import numpy as np
+import config
+
+class Outcome(IntEnum):
+    """
+    Integer codes for every outcome resolve_outcome() can produce.
+    The lowercase member name is the outcome string used elsewhere (e.g. 'arrest_success').
+    """
+    # --- HONEST OUTCOMES ---
+    ARREST_SUCCESS = 0
+    ARREST_FAILED = 1
+    INVESTIGATE_SUCCESS = 2
+    DE_ESCALATE_SUCCESS = 3
+    DE_ESCALATE_FAILED = 4
+    SEVERE_INJURY = 5
+    TICKET_SUCCESS = 6
+    TICKET_INVALID = 7
+    REPORT_SUCCESS = 8
+    WARRANT_SUCCESS = 9
+    WHISTLEBLOW_SUCCESS = 10
+
+    # --- CORRUPT OUTCOMES ---
+    SUCCESS = 11
+    CAUGHT = 12
+    EXTORTION_SUCCESS = 13
+    FRAME_SUCCESS = 14
+    TIP_OFF_SUCCESS = 15
+    TIP_OFF_USELESS = 16
+    DESTROY_SUCCESS = 17
+    INTIMIDATE_SUCCESS = 18
+    INTIMIDATE_USELESS = 19
+    STEAL_SUCCESS = 20
+    STEAL_USELESS = 21
+    BRUTALITY_SUCCESS = 22
+    ISOLATE_SUCCESS = 23
+    ISOLATE_USELESS = 24
+
+OUTCOME_NAMES = [o.name.lower() for o in Outcome]
+OUTCOME_CODES = {name: code for code, name in enumerate(OUTCOME_NAMES)}
+
+# Outcome -> config attribute holding its flat reward
+REWARD_SOURCES = {
+    Outcome.ARREST_SUCCESS: 'REWARD_ARREST',
+    Outcome.ARREST_FAILED: 'REWARD_ARREST_FAILED',
+    Outcome.INVESTIGATE_SUCCESS: 'REWARD_INVESTIGATE',
+    Outcome.DE_ESCALATE_SUCCESS: 'REWARD_DE_ESCALATE',
+    Outcome.DE_ESCALATE_FAILED: 'REWARD_DE_ESCALATE_FAILED',
+    Outcome.SEVERE_INJURY: 'REWARD_KILLED',
+    Outcome.TICKET_SUCCESS: 'REWARD_TICKET',
+    Outcome.TICKET_INVALID: 'REWARD_INVALID',
+    Outcome.REPORT_SUCCESS: 'REWARD_REPORT',
+    Outcome.WARRANT_SUCCESS: 'REWARD_WARRANT',
+    Outcome.WHISTLEBLOW_SUCCESS: 'REWARD_WHISTLEBLOW',
+    Outcome.CAUGHT: 'REWARD_CAUGHT',
+    Outcome.EXTORTION_SUCCESS: 'REWARD_EXTORT',
+    Outcome.FRAME_SUCCESS: 'REWARD_FRAME',
+    Outcome.TIP_OFF_SUCCESS: 'REWARD_TIP_OFF',
+    Outcome.TIP_OFF_USELESS: 'REWARD_INVALID',
+    Outcome.DESTROY_SUCCESS: 'REWARD_DESTROY',
+    Outcome.INTIMIDATE_SUCCESS: 'REWARD_INTIMIDATE',
+    Outcome.INTIMIDATE_USELESS: 'REWARD_INVALID',
+    Outcome.STEAL_SUCCESS: 'REWARD_STEAL',
+    Outcome.STEAL_USELESS: 'REWARD_INVALID',
+    Outcome.BRUTALITY_SUCCESS: 'REWARD_BRUTALITY',
+    Outcome.ISOLATE_SUCCESS: 'REWARD_ISOLATE',
+    Outcome.ISOLATE_USELESS: 'REWARD_INVALID',
+}
+
+_reward_cache = {'key': None, 'tables': None}
+
+def reward_table():
+    """
+    Returns (base, offer_scale, seized_scale) arrays indexed by outcome code.
+    reward = base + offer_scale * offer + seized_scale * seized_value
+    Rebuilt only when the reward settings in config change (e.g. via the Supervisor panel).
+    """
+    key = tuple(getattr(config, attr) for attr in REWARD_SOURCES.values()) + (config.REWARD_SUCCESS_FACTOR,)
+    if key != _reward_cache['key']:
+        base = np.zeros(len(Outcome))
+        offer_scale = np.zeros(len(Outcome))
+        seized_scale = np.zeros(len(Outcome))
+        for outcome, attr in REWARD_SOURCES.items():
+            base[outcome] = getattr(config, attr)
+        offer_scale[Outcome.SUCCESS] = config.REWARD_SUCCESS_FACTOR # Bribe scales with the offer
+        seized_scale[Outcome.STEAL_SUCCESS] = 1.0 # Theft is worth what was seized
+        _reward_cache['key'] = key
+        _reward_cache['tables'] = (base, offer_scale, seized_scale)
+    return _reward_cache['tables']
+
+def compute_rewards(codes, offer, seized_value):
+    """Array gather of rewards. Works on a single outcome code or on whole batches."""
+    base, offer_scale, seized_scale = reward_table()
+    return base[codes] + offer_scale[codes] * offer + seized_scale[codes] * seized_value
+
+def outcome_reward(outcome, state):
+    """Reward for a single outcome string against its scenario dict."""
+    code = OUTCOME_CODES.get(outcome)
+    if code is None:
+        return 0.0
+    return float(compute_rewards(code, state.get('offer', 0), state.get('seized_value', 0)))
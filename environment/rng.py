@@ -0,0 +1,47 @@
+import numpy as np
+import torch
+
+# Stream ids: each kind of randomness draws from its own stream, so changing how one is used
+# (e.g. a new exploration rule) never shifts the numbers another one sees
+STREAMS = {name: i for i, name in enumerate(
+    ['scenarios', 'outcomes', 'roster', 'exploration', 'ia_noise', 'hiring', 'torch', 'rollout'])}
+
+def new_seed():
+    """A fresh 63-bit run seed (for config.SEED = None)."""
+    return int(np.random.SeedSequence().generate_state(1, np.uint64)[0] >> np.uint64(1))
+
+class RNGStreams:
+    """
+    Counter-based random streams for one run. get(stream, episode, sub) returns a NumPy Generator
+    whose draws depend only on (seed, stream, episode, sub): a Philox generator keyed by the seed,
+    with the counter moved to that position. Any episode can therefore be replayed on its own,
+    in any process, without drawing everything before it.
+
+    One Generator object is kept per (stream, sub) and rewound by each get() with that pair, so
+    callers take it once per episode; retire() drops a sub that will not come back (an executed officer).
+    """
+    def __init__(self, seed=None):
+        self.seed = new_seed() if seed is None else int(seed)
+        self.key = np.random.SeedSequence(self.seed).generate_state(2, np.uint64)
+        self.generators = {} # (stream id, sub) -> (Generator, reusable state dict)
+
+    def get(self, stream, episode, sub=0):
+        slot = (STREAMS[stream], sub)
+        if slot not in self.generators:
+            bit_generator = np.random.Philox(key=self.key)
+            self.generators[slot] = (np.random.Generator(bit_generator), bit_generator.state)
+        generator, state = self.generators[slot]
+        # Setting the state (not building a new Philox) keeps a rewind at a few microseconds
+        state['state']['counter'][:] = (0, sub, episode, slot[0])
+        state['buffer_pos'] = 4 # Discard buffered output so the next draw starts at the new counter
+        state['has_uint32'] = 0
+        generator.bit_generator.state = state
+        return generator
+
+    def retire(self, sub):
+        for slot in [slot for slot in self.generators if slot[1] == sub]:
+            del self.generators[slot]
+
+    def seed_torch(self, episode):
+        """Reseeds torch's CPU generator from the 'torch' stream (replay sampling, batched exploration, new networks)."""
+        torch.default_generator.manual_seed(int(self.get('torch', episode).integers(2**63)))
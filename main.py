@@ -14,13 +14,9 @@ from config import (
     DB_PATH, PROJECT_ROOT, SEASON_LENGTH, INSPECTION_FREQUENCY,
     NUM_CORRUPT_COPS, NUM_HONEST_COPS, INITIAL_CORRUPTION_MIN,
     INITIAL_CORRUPTION_MAX, INITIAL_INTEGRITY_HONEST,
-    REWARD_SUCCESS_FACTOR, REWARD_CAUGHT, REWARD_REJECTED, REWARD_KILLED,
-    BRAIN_DIR, ALERT_DECAY_RATE,
-    REWARD_ARREST, REWARD_INVESTIGATE, REWARD_DE_ESCALATE, REWARD_TICKET, REWARD_REPORT,
-    REWARD_WARRANT, REWARD_WHISTLEBLOW, REWARD_EXTORT, REWARD_FRAME,
-    REWARD_TIP_OFF, REWARD_DESTROY, REWARD_INTIMIDATE, REWARD_STEAL, REWARD_BRUTALITY,
-    REWARD_ISOLATE, ACTIONS
+    BRAIN_DIR, STATE_FILE, ALERT_DECAY_RATE, ACTIONS
 )
+from environment.outcomes import outcome_reward
 from visualization.story_generator import generate_narrative
 from utils import execute_and_replace_agent
 
@@ -78,7 +74,7 @@ def main():
     schema_path = os.path.join(PROJECT_ROOT, 'database', 'schema.sql')
     db = DBManager(DB_PATH, schema_path)
     
-    state_file = os.path.join(PROJECT_ROOT, 'training_state.json')
+    state_file = STATE_FILE
     start_episode = 0
     if os.path.exists(state_file):
         try:
@@ -119,7 +115,7 @@ def main():
     else:
         # FRESH START
         db.execute_query("DELETE FROM cops"); db.execute_query("DELETE FROM bribe_history")
-        db.execute_query("DELETE FROM investigations"); db.execute_query("DELETE FROM orders"); db.execute_query("DELETE FROM episode_stats")
+        db.execute_query("DELETE FROM investigations"); db.execute_query("DELETE FROM orders"); db.execute_query("DELETE FROM episode_stats"); db.execute_query("DELETE FROM episode_rollups")
         
         chief = PoliceChief(0); agents_map[0] = chief
         db.execute_query("INSERT INTO cops (cop_id, name, cop_type, rank, personality) VALUES (?, ?, ?, ?, ?)", (0, chief.name, chief.cop_type, chief.rank, "strict"))
@@ -188,37 +184,8 @@ def main():
                 # Outcome
                 outcome = env.resolve_outcome(action, current_state)
                 
-                # Reward Logic
-                reward = 0
-                if outcome == 'isolate_success': reward = REWARD_ISOLATE
-                elif outcome == 'isolate_useless': reward = -50
-                elif outcome == 'caught': reward = REWARD_CAUGHT
-                elif outcome == 'arrest_success': reward = REWARD_ARREST
-                elif outcome == 'arrest_failed': reward = -100
-                elif outcome == 'investigate_success': reward = REWARD_INVESTIGATE
-                elif outcome == 'de_escalate_success': reward = REWARD_DE_ESCALATE
-                elif outcome == 'de_escalate_failed': reward = -200
-                elif outcome == 'severe_injury': reward = REWARD_KILLED
-                elif outcome == 'ticket_success': reward = REWARD_TICKET
-                elif outcome == 'ticket_invalid': reward = -50
-                elif outcome == 'report_success': reward = REWARD_REPORT
-                elif outcome == 'warrant_success': reward = REWARD_WARRANT
-                elif outcome == 'whistleblow_success': reward = REWARD_WHISTLEBLOW
-                # Corrupt Outcomes
-                elif outcome == 'success': 
-                    reward = current_state['offer'] * REWARD_SUCCESS_FACTOR
-                elif outcome == 'extortion_success': reward = REWARD_EXTORT
-                elif outcome == 'frame_success': reward = REWARD_FRAME
-                elif outcome == 'tip_off_success': reward = REWARD_TIP_OFF
-                elif outcome == 'tip_off_useless': reward = -50
-                elif outcome == 'destroy_success': reward = REWARD_DESTROY
-                elif outcome == 'intimidate_success': reward = REWARD_INTIMIDATE
-                elif outcome == 'intimidate_useless': reward = -50
-                elif outcome == 'steal_success': reward = current_state.get('seized_value',0)
-                elif outcome == 'steal_useless': reward = -50
-                elif outcome == 'brutality_success': reward = REWARD_BRUTALITY
-                elif outcome == 'rejected': reward = REWARD_REJECTED
-                else: reward = 0
+                # Reward Logic (shared lookup table)
+                reward = outcome_reward(outcome, current_state)
 
                 # Next State determination
                 if outcome in ['isolate_success', 'isolate_useless']:
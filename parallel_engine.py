@@ -0,0 +1,286 @@
+import time
+import queue
+import types
+import torch
+import torch.multiprocessing as mp
+from torch.nn.utils import parameters_to_vector, vector_to_parameters
+import config
+from agents.dqn_model import DQN
+from agents.featurizer import StateFeaturizer
+from agents.honest_cop import HonestCop
+from environment.game_world import SimulationEnvironment
+from environment.rng import RNGStreams
+from environment.outcomes import OUTCOME_CODES, OUTCOME_NAMES, outcome_reward
+from simulation_engine import SimulationEngine
+
+STATE_DIM = 14
+
+# Transition row layout in the shared chunk buffers (float64 so ids and offers stay exact)
+COL_AGENT = 0
+COL_STATE = slice(1, 1 + STATE_DIM)
+COL_ACTION = 15
+COL_REWARD = 16
+COL_NEXT = slice(17, 17 + STATE_DIM)
+COL_NON_FINAL = 31
+COL_OUTCOME = 32
+COL_OFFER = 33
+COL_EPISODE = 34 # Episode index within the chunk
+ROW_WIDTH = 35
+
+# Officer table published by the learner, one row per constable slot
+META_AGENT, META_KIND, META_EPSILON, META_CAUGHT, META_WEALTH, META_LAST_CAUGHT, META_CORRUPTION, META_PARANOIA = range(8)
+META_WIDTH = 8
+KIND_EMPTY, KIND_CORRUPT, KIND_HONEST = 0, 1, 2
+
+def _config_snapshot():
+    """Plain config values, re-applied in spawned workers so runtime overrides carry over."""
+    return {k: v for k, v in vars(config).items()
+            if k.isupper() and isinstance(v, (int, float, str, bool, list, tuple, dict))}
+
+def rollout_worker(worker_id, seed, config_values, shared, full_q, free_q, stop):
+    """
+    Actor process: runs its own SimulationEnvironment with epsilon-greedy constable policies
+    on the learner's published weights, and fills shared-memory chunks with transitions.
+    Each chunk comes with a ticket and the weight generation to roll it out on; its episodes draw
+    from the run's 'rollout' stream keyed by (ticket, episode in chunk), so a ticket's rollouts
+    do not depend on which worker ran it, or when.
+    """
+    for key, value in config_values.items():
+        setattr(config, key, value)
+    torch.set_num_threads(1)
+
+    rngs = RNGStreams(seed)
+    env = SimulationEnvironment()
+    honest = HonestCop(-1, "Worker_Honest", config.INITIAL_INTEGRITY_HONEST)
+    featurizer = StateFeaturizer(capacity=2)
+    nets = []
+    generation = -1
+    chunks = shared['chunks'][worker_id]
+
+    while not stop.is_set():
+        try:
+            chunk_idx, ticket, required = free_q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+
+        # Weight sync: wait for the generation this ticket was issued against (the learner publishes it
+        # once every earlier ticket is ingested), never a newer or older one
+        if required != generation:
+            while generation != required and not stop.is_set():
+                generation, meta, weights, current_episode = _read_published(shared)
+                if generation != required: time.sleep(0.001)
+            if stop.is_set(): break
+            nets = []
+            for slot in range(len(meta)):
+                net = None
+                if meta[slot, META_KIND] == KIND_CORRUPT:
+                    net = DQN(STATE_DIM, config.ACTION_DIM, config.HIDDEN_DIM)
+                    vector_to_parameters(weights[slot], net.parameters())
+                    net.eval()
+                nets.append(net)
+            slots = [s for s in range(len(meta)) if meta[s, META_KIND] != KIND_EMPTY]
+
+        chunk = chunks[chunk_idx]
+        rows, episodes = 0, 0
+        while rows <= len(chunk) - 3 and episodes < config.PARALLEL_CHUNK_EPISODES and slots:
+            rollout = ticket * config.PARALLEL_CHUNK_EPISODES + episodes
+            env.rng = rngs.get('rollout', rollout) # Officer, scenario and outcomes; sub 1 below: exploration
+            slot = slots[env.rng.integers(len(slots))]
+            if meta[slot, META_KIND] == KIND_HONEST:
+                state = env.generate_scenario()
+                env.resolve_outcome(honest.decide_bribe(state), state) # Honest cops don't learn
+            else:
+                rows = _run_corrupt_episode(env, meta[slot], nets[slot], current_episode, chunk, rows, rngs.get('rollout', rollout, 1), episodes, featurizer)
+            episodes += 1
+
+        full_q.put((worker_id, chunk_idx, ticket, rows, episodes))
+
+def _read_published(shared):
+    """
+    Copies the learner's weight generation, officer table, weights and episode. publish() holds 'version'
+    odd while it writes (a seqlock), so a copy taken during a publish, or across one, is thrown away and retried.
+    """
+    while True:
+        version = int(shared['version'][0])
+        if version % 2 == 0:
+            generation, episode = int(shared['generation'][0]), int(shared['episode'][0])
+            meta, weights = shared['meta'].clone(), shared['weights'].clone()
+            if int(shared['version'][0]) == version:
+                return generation, meta, weights, episode
+        time.sleep(0.001)
+
+def _run_corrupt_episode(env, meta_row, net, current_episode, chunk, rows, explore, episode, featurizer):
+    """Same multi-step loop as SimulationEngine.step(); writes one row per decision."""
+    officer = types.SimpleNamespace(
+        times_caught=float(meta_row[META_CAUGHT]), total_money_earned=float(meta_row[META_WEALTH]),
+        last_caught_episode=float(meta_row[META_LAST_CAUGHT]), corruption_score=float(meta_row[META_CORRUPTION]),
+        paranoia_level=float(meta_row[META_PARANOIA])
+    )
+    epsilon = float(meta_row[META_EPSILON])
+    current_state = env.generate_scenario()
+    state_tensor = featurizer.featurize_one(officer, current_state, current_episode, row=0)
+
+    for _ in range(3):
+        if explore.random() < epsilon:
+            action_idx = int(explore.integers(config.ACTION_DIM))
+        else:
+            with torch.no_grad():
+                action_idx = net(state_tensor.unsqueeze(0)).argmax().item()
+
+        outcome = env.resolve_outcome(config.ACTIONS[action_idx], current_state)
+        row = chunk[rows]
+        row[COL_AGENT] = meta_row[META_AGENT]
+        row[COL_STATE] = state_tensor
+        row[COL_ACTION] = action_idx
+        row[COL_REWARD] = outcome_reward(outcome, current_state)
+        row[COL_OUTCOME] = OUTCOME_CODES[outcome]
+        row[COL_OFFER] = current_state.get('offer', 0)
+        row[COL_EPISODE] = episode
+        rows += 1
+
+        if outcome not in ['isolate_success', 'isolate_useless']:
+            row[COL_NON_FINAL] = 0
+            break
+        state_tensor = featurizer.featurize_one(officer, current_state, current_episode, row=1) # Copied into the chunk before it is overwritten
+        row[COL_NEXT] = state_tensor
+        row[COL_NON_FINAL] = 1
+    return rows
+
+class ParallelTrainer:
+    """
+    Actor/learner training. Worker processes run rollouts on periodically synced weights
+    and push transitions through shared memory; this (learner) process owns the
+    SimulationEngine and therefore every CorruptCop, IADetective and PoliceChief optimizer.
+    Chunks are ingested in ticket order and weights published at fixed ticket boundaries, so a
+    seeded run trains the same way with any number of workers.
+    Supports per-officer brains (not SHARED_COP_BRAIN / VMAP_POPULATION).
+    """
+    def __init__(self, num_workers=None, engine=None):
+        self.engine = engine or SimulationEngine()
+        if self.engine.cop_brain is not None or self.engine.population is not None:
+            raise ValueError("Parallel rollouts need per-officer brains (disable SHARED_COP_BRAIN / VMAP_POPULATION).")
+        self.num_workers = num_workers or config.PARALLEL_WORKERS
+
+        capacity = len(self.engine.corrupt_ids) + len(self.engine.honest_ids)
+        param_count = sum(p.numel() for p in DQN(STATE_DIM, config.ACTION_DIM, config.HIDDEN_DIM).parameters())
+        self.shared = {
+            'weights': torch.zeros((capacity, param_count)).share_memory_(),
+            'meta': torch.zeros((capacity, META_WIDTH), dtype=torch.float64).share_memory_(),
+            'version': torch.zeros(1, dtype=torch.long).share_memory_(),
+            'generation': torch.zeros(1, dtype=torch.long).share_memory_(),
+            'episode': torch.zeros(1, dtype=torch.long).share_memory_(),
+            'chunks': torch.zeros((self.num_workers, 2, config.PARALLEL_CHUNK_SIZE, ROW_WIDTH), dtype=torch.float64).share_memory_()
+        }
+        self.transitions = 0 # Worker rows fed into the learners' replay memory
+
+    def publish(self, generation):
+        """Copies current constable weights, epsilons and memory stats into shared memory as weight generation N."""
+        engine = self.engine
+        meta = self.shared['meta']
+        self.shared['version'][0] += 1 # Odd while writing: workers retry their copy (see _read_published)
+        meta.zero_()
+        constables = (engine.corrupt_ids + engine.honest_ids)[:len(meta)]
+        for slot, cid in enumerate(constables):
+            cop = engine.agents_map[cid]
+            meta[slot, META_AGENT] = cid
+            if cop.cop_type == 'honest':
+                meta[slot, META_KIND] = KIND_HONEST
+                continue
+            meta[slot, META_KIND] = KIND_CORRUPT
+            meta[slot, META_EPSILON] = cop.epsilon
+            meta[slot, META_CAUGHT] = cop.times_caught
+            meta[slot, META_WEALTH] = cop.total_money_earned
+            meta[slot, META_LAST_CAUGHT] = cop.last_caught_episode
+            meta[slot, META_CORRUPTION] = cop.corruption_score
+            meta[slot, META_PARANOIA] = cop.paranoia_level
+            self.shared['weights'][slot] = parameters_to_vector(cop.policy_net.parameters()).detach()
+        self.shared['episode'][0] = engine.global_episodes + engine.episode_counter
+        self.shared['generation'][0] = generation
+        self.shared['version'][0] += 1 # Even again: the tables are consistent
+
+    def ingest(self, chunk, rows, episodes):
+        """Feeds a worker chunk into the learners episode by episode (outcomes, inspections, stats), then trains."""
+        engine = self.engine
+        table = chunk[:rows].tolist()
+        states, next_states = chunk[:rows, COL_STATE].float(), chunk[:rows, COL_NEXT].float() # One conversion per chunk
+        r = 0
+        for episode in range(episodes):
+            engine.episode_counter += 1
+            engine.current_global_ep = engine.global_episodes + engine.episode_counter
+            while r < len(table) and table[r][COL_EPISODE] == episode:
+                row, i = table[r], r
+                r += 1
+                cop = engine.agents_map.get(int(row[COL_AGENT]))
+                if cop is None or cop.cop_type != 'corrupt':
+                    continue # Officer was executed after the worker's last sync
+                next_state = next_states[i] if row[COL_NON_FINAL] else None
+                cop.remember(states[i], int(row[COL_ACTION]), row[COL_REWARD], next_state)
+                self.transitions += 1
+                engine.apply_outcome(cop, OUTCOME_NAMES[int(row[COL_OUTCOME])], {'offer': row[COL_OFFER]})
+            if engine.current_global_ep % config.INSPECTION_FREQUENCY == 0:
+                engine.run_inspections()
+            engine.record_stats(engine.collect_stats()) # One episode_stats row per episode, as SimulationEngine.step() writes
+        engine.rngs.seed_torch(engine.current_global_ep) # Replay-buffer sampling for this batch of updates
+        engine.train_agents()
+
+    def run(self, episodes):
+        """Trains for (at least) N episodes across all workers. Returns throughput stats like train.train()."""
+        engine = self.engine
+        engine.headless = True
+        engine.learn_at_batch_end = True # Learner trains once per ingested chunk
+        ctx = mp.get_context('spawn')
+        full_q = ctx.Queue()
+        free_qs = [ctx.Queue() for _ in range(self.num_workers)]
+        stop = ctx.Event()
+        self.publish(0)
+
+        # Chunks go out with consecutive tickets; this run's tickets start past every episode already ingested.
+        # Ticket t rolls out on generation (t - first) // sync_tickets, published once every ticket before that boundary is ingested
+        first = engine.global_episodes + engine.episode_counter
+        sync_tickets = max(1, -(-config.PARALLEL_SYNC_EPISODES // config.PARALLEL_CHUNK_EPISODES))
+        tickets = iter(range(first, 2**62))
+        issue = lambda ticket: (ticket, (ticket - first) // sync_tickets)
+        workers = []
+        for w in range(self.num_workers):
+            for chunk_idx in range(2):
+                free_qs[w].put((chunk_idx, *issue(next(tickets))))
+            p = ctx.Process(target=rollout_worker, daemon=True,
+                            args=(w, engine.rngs.seed, _config_snapshot(), self.shared, full_q, free_qs[w], stop))
+            p.start()
+            workers.append(p)
+
+        start_grad_steps, start_transitions = engine.gradient_steps, self.transitions
+        start = time.perf_counter()
+        done = 0
+        arrived = {} # Reorder buffer: ticket -> finished chunk, held until every earlier ticket is ingested
+        next_ticket = first
+        try:
+            while done < episodes:
+                worker_id, chunk_idx, ticket, rows, chunk_episodes = full_q.get()
+                arrived[ticket] = (worker_id, chunk_idx, rows, chunk_episodes)
+                while next_ticket in arrived and done < episodes:
+                    worker_id, chunk_idx, rows, chunk_episodes = arrived.pop(next_ticket)
+                    self.ingest(self.shared['chunks'][worker_id, chunk_idx], rows, chunk_episodes)
+                    done += chunk_episodes
+                    next_ticket += 1
+                    if (next_ticket - first) % sync_tickets == 0:
+                        self.publish((next_ticket - first) // sync_tickets)
+                    free_qs[worker_id].put((chunk_idx, *issue(next(tickets))))
+        finally:
+            stop.set()
+            for p in workers:
+                p.join(timeout=5)
+                if p.is_alive(): p.terminate()
+        elapsed = max(time.perf_counter() - start, 1e-9)
+
+        engine.save_state()
+        grad_steps = engine.gradient_steps - start_grad_steps
+        return {
+            'episodes': done,
+            'seconds': elapsed,
+            'episodes_per_sec': done / elapsed,
+            'gradient_steps': grad_steps,
+            'gradient_steps_per_sec': grad_steps / elapsed,
+            'transitions': self.transitions - start_transitions,
+            'total_episodes': engine.global_episodes + engine.episode_counter
+        }
@@ -1,11 +1,21 @@
 import os
-import random
 import json
 import traceback
 import time
-from database.db_manager import DBManager
+import threading
+import numpy as np
+from database.db_manager import DBManager, BRIBE_LOG_QUERY
+from database.telemetry import TelemetryWriter
 from agents import CorruptCop, HonestCop, PoliceChief, IADetective
+from agents.shared_brain import SharedCopBrain
+from agents.population import CopPopulation
+from agents.population_stats import PopulationStats
+from agents.registry import AgentRegistry
+from agents.checkpoint import CheckpointWriter, DepartmentCheckpoint, dump_json, save_department, agent_state, restore_agent, brain_state, load_brain_state
+from agents.ia_detective import IA_OUTCOMES
 from environment.game_world import SimulationEnvironment
+from environment.rng import RNGStreams
+from environment.outcomes import OUTCOME_CODES, outcome_reward
 import config # CHANGED
 from visualization.story_generator import generate_narrative
 from utils import execute_and_replace_agent
@@ -22,35 +32,69 @@ class SimulationEngine:
         self.honest_ids = []
         self.chief = None
         self.ia = None
+        self.cop_brain = None # SharedCopBrain when config.SHARED_COP_BRAIN is on
+        self.population = None # CopPopulation when config.VMAP_POPULATION is on
+        self.pop_stats = PopulationStats() # Running corruption/wealth sums for O(1) averages
+        self.registry = None # AgentRegistry of constable state, rebuilt by initialize_agents()
         
         # Performance modes
-        self.turbo_mode = False  # When True, minimal UI updates for max speed
+        self.turbo_mode = False  # When True, no narrative log lines for the UI
+        self.headless = False    # When True, no narrative and no UI payloads at all (see train.py)
+        self.gradient_steps = 0  # Total optimizer steps taken by all agents
+        self.lock = threading.RLock() # Held by the app around step() / reset(); snapshot() takes it
+        self.last_action = ""
+        self.learn_at_batch_end = config.LEARN_AT_BATCH_END  # Store transitions now, train every LEARN_BATCH_EPISODES
         
         # Initialize components
         schema_path = os.path.join(config.PROJECT_ROOT, 'database', 'schema.sql')
         self.db = DBManager(config.DB_PATH, schema_path)
+        self.telemetry = TelemetryWriter(self.db) # Background writer for per-episode rows
+        self.checkpoints = CheckpointWriter() # Background writer for brain files and the state file
         self.env = SimulationEnvironment()
-        self.state_file = os.path.join(config.PROJECT_ROOT, 'training_state.json')
+        self.rngs = None # RNGStreams for this run, seeded by initialize_agents()
+        self.scenario_pool = None
+        self.scenario_key = None # (block, size) the pool was rolled for
+        self.state_file = config.STATE_FILE
         
         self.initialize_agents()
 
     def initialize_agents(self):
         start_episode = 0
-        if os.path.exists(self.state_file):
+        checkpoint = None
+        saved = {} # Run-level state next to the episode count: seed, alert level
+        if config.CHECKPOINT_FORMAT == 'department' and os.path.exists(config.CHECKPOINT_FILE):
+            try:
+                checkpoint = DepartmentCheckpoint(config.CHECKPOINT_FILE)
+                start_episode = checkpoint.meta.get('total_episodes', 0)
+                saved = checkpoint.meta
+            except (OSError, ValueError):
+                checkpoint = None
+        if checkpoint is None and os.path.exists(self.state_file):
             try:
                 with open(self.state_file, 'r') as f:
                     data = json.load(f)
                     start_episode = data.get('total_episodes', 0)
+                    saved = data
             except:
                 start_episode = 0
         
         self.global_episodes = start_episode
+        if not start_episode: saved = {}
+        # A resumed run keeps its seed, so episode N draws the same numbers whichever session plays it
+        self.rngs = RNGStreams(saved.get('seed', config.SEED))
+        self.rngs.seed_torch(start_episode) # Brains built up front (shared / stacked) start from seeded weights
+        self.global_alert_level = saved.get('global_alert_level', 0.0)
+        self.scenario_pool = self.scenario_key = None
         self.agents_map = {}
         self.corrupt_ids = []
         self.honest_ids = []
+        self.registry = AgentRegistry(config.NUM_CORRUPT_COPS + config.NUM_HONEST_COPS)
         personalities = ['greedy', 'cautious', 'paranoid']
+        self.cop_brain = SharedCopBrain(load=checkpoint is None) if config.SHARED_COP_BRAIN else None
 
-        if self.global_episodes > 0:
+        if self.global_episodes > 0 and checkpoint is not None:
+            self.restore_checkpoint(checkpoint)
+        elif self.global_episodes > 0:
             # RESUME logic 
             rows = self.db.fetch_all("SELECT cop_id, name, cop_type, rank, personality, corruption_score, loyalty_score, times_bribed, times_caught, total_money_earned FROM cops WHERE status='active'")
             if not rows: # Fallback if DB is empty
@@ -63,12 +107,12 @@ class SimulationEngine:
                     elif c_type == 'detective':
                         self.ia = IADetective(cid); self.agents_map[cid] = self.ia
                     elif c_type == 'corrupt':
-                        agent = CorruptCop(cid, name, pers, c_score)
+                        agent = CorruptCop(cid, name, pers, c_score, shared_brain=self.cop_brain, registry=self.registry)
                         agent.loyalty_score = l_score; agent.times_bribed = t_bribed; agent.times_caught = t_caught
                         agent.total_money_earned = money
                         self.agents_map[cid] = agent; self.corrupt_ids.append(cid)
                     elif c_type == 'honest':
-                        agent = HonestCop(cid, name, l_score)
+                        agent = HonestCop(cid, name, l_score, registry=self.registry)
                         agent.times_bribed = t_bribed; agent.times_caught = t_caught
                         agent.total_money_earned = money
                         self.agents_map[cid] = agent; self.honest_ids.append(cid)
@@ -76,7 +120,7 @@ class SimulationEngine:
         if self.global_episodes == 0 or not self.agents_map:
             # FRESH START
             self.db.execute_query("DELETE FROM cops"); self.db.execute_query("DELETE FROM bribe_history")
-            self.db.execute_query("DELETE FROM investigations"); self.db.execute_query("DELETE FROM orders"); self.db.execute_query("DELETE FROM episode_stats")
+            self.db.execute_query("DELETE FROM investigations"); self.db.execute_query("DELETE FROM orders"); self.db.execute_query("DELETE FROM episode_stats"); self.db.execute_query("DELETE FROM episode_rollups")
             
             self.chief = PoliceChief(0); self.agents_map[0] = self.chief
             self.db.execute_query("INSERT INTO cops (cop_id, name, cop_type, rank, personality) VALUES (?, ?, ?, ?, ?)", (0, self.chief.name, self.chief.cop_type, self.chief.rank, "strict"))
@@ -84,37 +128,122 @@ class SimulationEngine:
             self.ia = IADetective(1); self.agents_map[1] = self.ia
             self.db.execute_query("INSERT INTO cops (cop_id, name, cop_type, rank, personality) VALUES (?, ?, ?, ?, ?)", (1, self.ia.name, self.ia.cop_type, self.ia.rank, "analytical"))
 
+            hiring = self.rngs.get('hiring', 0) # Episode 0: the starting roster
             for i in range(config.NUM_CORRUPT_COPS):
-                cid = 2 + i; p = personalities[i % 3]; c = random.uniform(config.INITIAL_CORRUPTION_MIN, config.INITIAL_CORRUPTION_MAX)
-                agent = CorruptCop(cid, f"Officer_{cid}", p, c)
+                cid = 2 + i; p = personalities[i % 3]; c = float(hiring.uniform(config.INITIAL_CORRUPTION_MIN, config.INITIAL_CORRUPTION_MAX))
+                agent = CorruptCop(cid, f"Officer_{cid}", p, c, shared_brain=self.cop_brain, registry=self.registry)
                 self.agents_map[cid] = agent; self.corrupt_ids.append(cid)
                 self.db.execute_query("INSERT INTO cops (cop_id, name, cop_type, rank, personality, corruption_score) VALUES (?, ?, ?, ?, ?, ?)", (cid, agent.name, agent.cop_type, agent.rank, agent.personality, agent.corruption_score))
 
             for i in range(config.NUM_HONEST_COPS):
-                hid = 2 + config.NUM_CORRUPT_COPS + i; i_sc = random.uniform(config.INITIAL_INTEGRITY_HONEST-5, config.INITIAL_INTEGRITY_HONEST+5)
-                agent = HonestCop(hid, f"Officer_{hid}", i_sc)
+                hid = 2 + config.NUM_CORRUPT_COPS + i; i_sc = float(hiring.uniform(config.INITIAL_INTEGRITY_HONEST-5, config.INITIAL_INTEGRITY_HONEST+5))
+                agent = HonestCop(hid, f"Officer_{hid}", i_sc, registry=self.registry)
                 self.agents_map[hid] = agent; self.honest_ids.append(hid)
                 self.db.execute_query("INSERT INTO cops (cop_id, name, cop_type, rank, personality, loyalty_score) VALUES (?, ?, ?, ?, ?, ?)", (hid, agent.name, agent.cop_type, agent.rank, agent.personality, agent.integrity_score))
 
         # Ensure Chief and IA exist if loading failed to assign them
         if self.chief is None and 0 in self.agents_map: self.chief = self.agents_map[0]
         if self.ia is None and 1 in self.agents_map: self.ia = self.agents_map[1]
+        self.pop_stats.rebuild(self.agents_map.values())
+        self.cop_id_floor = (self.db.fetch_one("SELECT MAX(cop_id) FROM cops")[0] or 0) + 1
+        if checkpoint is not None and 'pop_sums' in saved: # The saved running sums, so averages match the uninterrupted run bit for bit
+            self.pop_stats.corruption_sum, self.pop_stats.wealth_sum = saved['pop_sums']
+
+        # Stack independent brains for batched training
+        self.population = None
+        if config.VMAP_POPULATION and self.cop_brain is None and self.corrupt_ids:
+            # Rows in their saved order (successors keep their predecessor's row), so minibatch draws line up
+            rows = saved.get('population_rows') if checkpoint is not None else None
+            if rows is None or sorted(rows) != sorted(self.corrupt_ids): rows = self.corrupt_ids
+            self.population = CopPopulation([self.agents_map[cid] for cid in rows])
+            if checkpoint is not None: self.population.pending_updates = saved.get('population_pending', 0)
+
+    def restore_checkpoint(self, checkpoint):
+        """Rebuilds the department from a DepartmentCheckpoint (one mapped file, decoded agent by agent)."""
+        if self.cop_brain is not None and 'shared_brain' in checkpoint:
+            state = checkpoint.entry('shared_brain')
+            try:
+                load_brain_state(self.cop_brain, state)
+                if 'memory_slots' in state: self.cop_brain.memory_slots[:len(state['memory_slots'])] = state['memory_slots']
+            except (KeyError, RuntimeError, ValueError): pass # Slot count changed: start fresh
+            self.cop_brain.saved_slots = state.get('slots', {})
+
+        slots = {}
+        for cid in checkpoint.meta.get('agents', []):
+            state = checkpoint.entry(f"agent_{cid}")
+            fields = state['fields']
+            if state['cop_type'] == 'chief':
+                agent = self.chief = PoliceChief(cid, load=False)
+            elif state['cop_type'] == 'detective':
+                agent = self.ia = IADetective(cid, load=False)
+            elif state['cop_type'] == 'corrupt':
+                agent = CorruptCop(cid, fields['name'], fields['personality'], 0.0, shared_brain=self.cop_brain, registry=self.registry, load=False)
+                self.corrupt_ids.append(cid)
+            else:
+                agent = HonestCop(cid, fields['name'], fields['integrity_score'], registry=self.registry)
+                self.honest_ids.append(cid)
+            restore_agent(agent, state)
+            self.agents_map[cid] = agent
+            if 'slot' in state: slots[agent] = state['slot']
+
+        # Same registry slots (and free list) as when saved: sweeps and slot recycling then run in the same order
+        if 'registry' in checkpoint.meta and slots:
+            self.registry.relocate(slots, checkpoint.meta['registry'])
+        self.reconcile_cops()
+
+    def reconcile_cops(self):
+        """
+        Brings the cops table back to the restored roster. Officers executed after the checkpoint are active
+        again; successors hired after it were never hired ('rolled_back'). Their rows (and ids) stay, see next_cop_id().
+        """
+        if not self.agents_map: return
+        conn = self.db.get_connection()
+        with conn:
+            conn.execute("UPDATE cops SET status='rolled_back' WHERE status='active' AND cop_id > ?", (max(self.agents_map),))
+            conn.executemany("UPDATE cops SET status='active' WHERE cop_id=? AND status!='active'", [(cid,) for cid in self.agents_map])
+
+    def next_cop_id(self):
+        """Id for a new hire: above the roster and above every id in the cops table (rolled-back hires keep theirs)."""
+        return max(max(self.agents_map) + 1, self.cop_id_floor)
+
+    def department_state(self):
+        """Everything save_department() needs: episode count, run seed, roster order and one entry per agent."""
+        entries = {f"agent_{cid}": agent_state(agent, config.CHECKPOINT_REPLAY) for cid, agent in self.agents_map.items()}
+        if self.cop_brain is not None:
+            shared = brain_state(self.cop_brain, config.CHECKPOINT_REPLAY)
+            shared['slots'] = {agent_id: slot for slot, agent_id in self.cop_brain.owners.items()}
+            if config.CHECKPOINT_REPLAY: shared['memory_slots'] = self.cop_brain.memory_slots[:len(self.cop_brain.memory)].clone()
+            entries['shared_brain'] = shared
+        meta = dict(self.run_state(), agents=list(self.agents_map), registry=self.registry.layout(),
+                    pop_sums=[self.pop_stats.corruption_sum, self.pop_stats.wealth_sum])
+        if self.population is not None:
+            meta.update(population_rows=[cop.agent_id for cop in self.population.cops], population_pending=self.population.pending_updates)
+        return {'meta': meta, 'entries': entries}
+
+    def run_state(self):
+        """Run-level state saved with every checkpoint (a resume continues the same seeded run)."""
+        return {'total_episodes': self.global_episodes + self.episode_counter, 'seed': self.rngs.seed,
+                'global_alert_level': self.global_alert_level}
 
     def step(self):
         """Runs a single episode step."""
         if not self.agents_map: return None
         
-        self.current_global_ep = self.global_episodes + self.episode_counter + 1
+        self.current_global_ep = ep = self.global_episodes + self.episode_counter + 1
         self.global_alert_level = max(0.0, self.global_alert_level - config.ALERT_DECAY_RATE)
         
         all_constables = self.corrupt_ids + self.honest_ids
         if not all_constables: return None
         
-        active_cop_id = random.choice(all_constables)
+        # Every draw below comes from (seed, stream, episode), so this episode replays exactly from a checkpoint
+        self.rngs.seed_torch(ep)
+        active_cop_id = all_constables[self.rngs.get('roster', ep).integers(len(all_constables))]
         cop_agent = self.agents_map[active_cop_id]
+        if cop_agent.cop_type == 'corrupt': cop_agent.rng = self.rngs.get('exploration', ep, active_cop_id)
+        self.env.rng = self.rngs.get('outcomes', ep)
         
         # Scenario (Initial)
-        scenario = self.env.generate_scenario()
+        scenario = self.next_scenario()
         scenario['alert_level'] = self.global_alert_level
         current_state = scenario
 
@@ -126,6 +255,10 @@ class SimulationEngine:
         final_outcome = ""
         final_action = ""
 
+        # Sampled per-step logging (1 in BRIBE_LOG_SAMPLE_RATE episodes)
+        sample_rate = config.BRIBE_LOG_SAMPLE_RATE
+        bribe_log = [] if sample_rate and self.current_global_ep % sample_rate == 0 else None
+
         while not done and step_count < 3:
             step_count += 1
             
@@ -136,59 +269,24 @@ class SimulationEngine:
             else:
                     action = cop_agent.decide_bribe(current_state, current_episode=self.current_global_ep)
 
-            # Outcome
+            # Outcome (log the scene as the cop saw it, before resolution changes witnesses)
+            if bribe_log is not None:
+                bribe_log.append([self.current_global_ep, active_cop_id, config.ACTIONS.index(action), None,
+                                  current_state['offer'], current_state['witnesses'], current_state['ia_nearby'], current_state['location_risk']])
             outcome = self.env.resolve_outcome(action, current_state)
+            if bribe_log is not None:
+                bribe_log[-1][3] = OUTCOME_CODES[outcome]
             
             # Keep track for logging
             final_action = action
             final_outcome = outcome
 
-            # Reward Logic (Simplified for Engine - Logic is same as main.py)
-            reward = 0
-            # [Copying Reward Logic from main.py]
-            if outcome == 'isolate_success': reward = config.REWARD_ISOLATE
-            elif outcome == 'isolate_useless': reward = -50
-            elif outcome == 'caught': reward = config.REWARD_CAUGHT
-            elif outcome == 'arrest_success': reward = config.REWARD_ARREST
-            elif outcome == 'arrest_failed': reward = -100
-            elif outcome == 'investigate_success': reward = config.REWARD_INVESTIGATE
-            elif outcome == 'de_escalate_success': reward = config.REWARD_DE_ESCALATE
-            elif outcome == 'de_escalate_failed': reward = -200
-            elif outcome == 'severe_injury': reward = config.REWARD_KILLED
-            elif outcome == 'ticket_success': reward = config.REWARD_TICKET
-            elif outcome == 'ticket_invalid': reward = -50
-            elif outcome == 'report_success': reward = config.REWARD_REPORT
-            elif outcome == 'warrant_success': reward = config.REWARD_WARRANT
-            elif outcome == 'whistleblow_success': reward = config.REWARD_WHISTLEBLOW
-            elif outcome == 'success': reward = current_state['offer'] * config.REWARD_SUCCESS_FACTOR
-            elif outcome == 'extortion_success': reward = config.REWARD_EXTORT
-            elif outcome == 'frame_success': reward = config.REWARD_FRAME
-            elif outcome == 'tip_off_success': reward = config.REWARD_TIP_OFF
-            elif outcome == 'tip_off_useless': reward = -50
-            elif outcome == 'destroy_success': reward = config.REWARD_DESTROY
-            elif outcome == 'intimidate_success': reward = config.REWARD_INTIMIDATE
-            elif outcome == 'intimidate_useless': reward = -50
-            elif outcome == 'steal_success': reward = current_state.get('seized_value',0)
-            elif outcome == 'steal_useless': reward = -50
-            elif outcome == 'brutality_success': reward = config.REWARD_BRUTALITY
-            # 'rejected' outcome removed from game world
-            else: reward = 0
+            # Reward Logic (shared lookup table)
+            reward = outcome_reward(outcome, current_state)
 
             # Update Stats & Kickbacks
             if cop_agent.cop_type == 'corrupt':
-                offer = current_state.get('offer', 0)
-                outcome_val = offer if outcome in ['success', 'extortion_success'] else 0
-                cop_agent.update_stats(outcome, outcome_val, self.current_global_ep)
-                
-                # KICKBACK TO CHIEF (10%)
-                if outcome_val > 0 and self.chief:
-                    kickback = outcome_val * 0.10
-                    # Ensure Chief has attribute
-                    if not hasattr(self.chief, 'total_money_earned'): self.chief.total_money_earned = 0
-                    self.chief.total_money_earned += kickback
-                    
-                    # Deduct from Cop? Optional. Let's say it's a tax.
-                    cop_agent.total_money_earned -= kickback
+                self.apply_outcome(cop_agent, outcome, current_state)
 
             # Next State
             if outcome in ['isolate_success', 'isolate_useless']:
@@ -200,108 +298,214 @@ class SimulationEngine:
 
             # Learn
             if cop_agent.cop_type == 'corrupt':
-                cop_agent.learn(reward, current_episode=self.current_global_ep, next_state_raw=next_state)
+                self.gradient_steps += cop_agent.learn(reward, current_episode=self.current_global_ep, next_state_raw=next_state, train=not self.learn_at_batch_end)
+                if self.population is not None and not self.learn_at_batch_end:
+                    self.gradient_steps += self.population.train()
             
             if not done:
                 current_state = next_state
         
         self.episode_counter += 1
+        if config.AUTOSAVE_EVERY and self.episode_counter % config.AUTOSAVE_EVERY == 0:
+            self.save_state(wait=False)
+        if bribe_log:
+            self.telemetry.enqueue_many(BRIBE_LOG_QUERY, bribe_log)
         
-        # Narrative
-        l1, l2 = generate_narrative(cop_agent.name, current_state, final_action, final_outcome)
-        log_entry = f"[Ep {self.current_global_ep}] {l1} -> {l2}"
+        # Narrative (skipped in turbo mode)
+        if not (self.headless or self.turbo_mode):
+            l1, l2 = generate_narrative(cop_agent.name, current_state, final_action, final_outcome)
+            log_entry = f"[Ep {self.current_global_ep}] {l1} -> {l2}"
 
         # Hierarchy Checks
         Hierarchy_Log = []
-        if self.episode_counter % config.INSPECTION_FREQUENCY == 0:
-             if self.ia and self.chief:
-                targets = random.sample(list(self.agents_map.keys()), min(3, len(self.agents_map)))
-                for target_id in targets:
-                    target = self.agents_map[target_id]
-                    if target.cop_type not in ['corrupt', 'honest']: continue
-                    
-                    cop_data = {
-                        'corruption_score': getattr(target, 'corruption_score', 0),
-                        'total_money_earned': getattr(target, 'total_money_earned', 0),
-                        'times_caught': getattr(target, 'times_caught', 0),
-                        'loyalty_score': getattr(target, 'loyalty_score', 50)
-                    }
-                    ia_action = self.ia.decide_action(cop_data, self.global_alert_level)
-                    outcome, ia_reward = self.ia.execute_logic(ia_action, cop_data)
-                    self.ia.learn(ia_reward)
-
-                    # CRITICAL FIX: Chief learns whenever IA sends a cop!
-                    if ia_action == 'SEND_TO_CHIEF':  # Changed from !='IGNORE'
-                        # Calculate Global Corruption for Chief's Context
-                        corrupt_cops = [a for a in self.agents_map.values() if a.cop_type == 'corrupt']
-                        avg_corr = sum([c.corruption_score for c in corrupt_cops]) / max(1, len(corrupt_cops))
-
-                        # Chief ALWAYS learns when IA sends someone
-                        chief_action = self.chief.decide_punishment(outcome, cop_data, avg_corr)
-                        chief_reward = self.chief.calculate_reward(chief_action, outcome, cop_data, avg_corr)
-                        self.chief.learn(chief_reward)
-                        
-                        # Execute the punishment
-                        event_msg = ""
-                        if chief_action == 'EXECUTE' and target.cop_type == 'corrupt':
-                            success, msg = execute_and_replace_agent(target.agent_id, self.agents_map, self.corrupt_ids, self.db, reason="CHIEF_AI")
-                            event_msg = f"⚖️ EXECUTION: Officer_{target.agent_id} eliminiated. {msg}"
-                        elif chief_action == 'FIRE':
-                             event_msg = f"⚖️ FIRED: Officer_{target.agent_id}."
-                        
-                        if event_msg: Hierarchy_Log.append(event_msg)
-                        self.db.execute_query("INSERT INTO investigations (episode, target_cop_id, outcome) VALUES (?, ?, ?)", 
-                                             (self.current_global_ep, target.agent_id, f"{ia_action}->{outcome}->{chief_action}"))
-
-        stats = {
-            "corruption_level": sum([getattr(a, 'corruption_score', 0) for a in self.agents_map.values() if a.cop_type == 'corrupt']) / len(self.corrupt_ids) if self.corrupt_ids else 0,
-            "avg_wealth_corrupt": sum([getattr(a, 'total_money_earned', 0) for a in self.agents_map.values() if a.cop_type == 'corrupt']) / len(self.corrupt_ids) if self.corrupt_ids else 0,
-            "chief_wealth": getattr(self.chief, 'total_money_earned', 0) if self.chief else 0,
-            "chief_executions": getattr(self.chief, 'executions', 0) if self.chief else 0,
-            "active_agents": len(self.agents_map)
+        if ep % config.INSPECTION_FREQUENCY == 0:
+            Hierarchy_Log = self.run_inspections()
+
+        if self.learn_at_batch_end and ep % config.LEARN_BATCH_EPISODES == 0:
+            self.train_agents()
+
+        stats = self.collect_stats()
+        self.record_stats(stats)
+
+        if self.headless:
+            return None
+
+        # Per-step events only; the UI polls snapshot() for state at its own rate
+        self.last_action = final_action
+        return {
+            "episode": self.current_global_ep,
+            "log": log_entry,
+            "hierarchy_logs": Hierarchy_Log
         }
+
+    def snapshot(self):
+        """Current episode, stats and roster for the dashboard. Taken under self.lock, which the app holds while stepping."""
+        with self.lock:
+            return {
+                "episode": self.global_episodes + self.episode_counter,
+                "stats": self.collect_stats(),
+                "turbo": self.turbo_mode,
+                "agents": [
+                    {
+                        "id": uid, 
+                        "name": ag.name, 
+                        "type": ag.cop_type, 
+                        "corruption": getattr(ag, 'corruption_score', 0),
+                        "action": self.last_action
+                    }
+                    for uid, ag in self.agents_map.items()
+                ]
+            }
+
+    def apply_outcome(self, cop_agent, outcome, state):
+        """Updates a corrupt cop's stats for an outcome and pays the Chief's kickback."""
+        offer = state.get('offer', 0)
+        outcome_val = offer if outcome in ['success', 'extortion_success'] else 0
+        cop_agent.update_stats(outcome, outcome_val, self.current_global_ep)
         
-        # PERSIST STATS TO DB (Fix for Blank Graphs)
-        try:
-            current_corr = stats["corruption_level"]
-            avg_wealth = stats["avg_wealth_corrupt"]
-            chief_wealth = stats["chief_wealth"]
-            self.db.execute_query(
-                "INSERT INTO episode_stats (episode, corruption_level, avg_wealth, chief_wealth) VALUES (?, ?, ?, ?)",
-                (self.current_global_ep, current_corr, avg_wealth, chief_wealth)
-            )
-        except Exception as e:
-            # print(f"DB Log Error: {e}")
-            pass
-
-        # In turbo mode, only return data every 100 episodes to reduce UI overhead
-        if self.turbo_mode and (self.episode_counter % 100 != 0):
-            return None  # Skip UI update for speed
+        # KICKBACK TO CHIEF (10%)
+        if outcome_val > 0 and self.chief:
+            kickback = outcome_val * 0.10
+            # Ensure Chief has attribute
+            if not hasattr(self.chief, 'total_money_earned'): self.chief.total_money_earned = 0
+            self.chief.total_money_earned += kickback
+            
+            # Deduct from Cop? Optional. Let's say it's a tax.
+            cop_agent.total_money_earned -= kickback
+
+    def run_inspections(self):
+        """IA inspects a random sample of officers; the Chief punishes whoever is sent up. Returns event logs."""
+        Hierarchy_Log = []
+        if not (self.ia and self.chief):
+            return Hierarchy_Log
+        ep = self.current_global_ep
+        self.ia.rng = self.rngs.get('exploration', ep, self.ia.agent_id)
+        self.ia.noise_rng = self.rngs.get('ia_noise', ep)
+        self.chief.rng = self.rngs.get('exploration', ep, self.chief.agent_id)
+        roster = self.rngs.get('roster', ep, 1) # Sub 1: who gets audited (sub 0 picked the acting officer)
+        if config.INSPECTION_SWEEP:
+            return self.run_inspection_sweep(roster)
+
+        ids = list(self.agents_map.keys())
+        targets = [ids[i] for i in roster.choice(len(ids), min(3, len(ids)), replace=False)]
+        for target_id in targets:
+            target = self.agents_map[target_id]
+            if target.cop_type not in ['corrupt', 'honest']: continue
+            
+            cop_data = target.registry.row(target.reg_slot) # corruption_score, total_money_earned, times_caught, loyalty_score, ...
+            ia_action = self.ia.decide_action(cop_data, self.global_alert_level)
+            outcome, ia_reward = self.ia.execute_logic(ia_action, cop_data)
+            self.gradient_steps += self.ia.learn(ia_reward, train=not self.learn_at_batch_end)
+
+            # CRITICAL FIX: Chief learns whenever IA sends a cop!
+            if ia_action == 'SEND_TO_CHIEF':  # Changed from !='IGNORE'
+                event_msg = self.refer_to_chief(target, cop_data, ia_action, outcome)
+                if event_msg: Hierarchy_Log.append(event_msg)
+        return Hierarchy_Log
+
+    def run_inspection_sweep(self, roster):
+        """
+        Batched audit: the IA scores INSPECTION_SWEEP_SIZE officers (0 = whole roster, sampled with `roster`)
+        straight from the registry columns in one forward pass and trains once; referrals then go to the Chief one by one.
+        """
+        Hierarchy_Log = []
+        slots = self.registry.active_slots()
+        if config.INSPECTION_SWEEP_SIZE and config.INSPECTION_SWEEP_SIZE < len(slots):
+            slots = roster.choice(slots, config.INSPECTION_SWEEP_SIZE, replace=False)
+        if len(slots) == 0:
+            return Hierarchy_Log
+
+        columns = self.registry.columns
+        actions, outcomes, _, steps = self.ia.sweep(columns['corruption_score'][slots], columns['total_money_earned'][slots],
+                                                    columns['times_caught'][slots], self.global_alert_level,
+                                                    train=not self.learn_at_batch_end)
+        self.gradient_steps += steps
+
+        # Resolve referrals; capture targets first since executions recycle registry slots
+        sent = np.flatnonzero(actions == config.IA_ACTIONS_NAMES.index('SEND_TO_CHIEF'))
+        referrals = [(self.registry.agents[slots[i]], self.registry.row(slots[i]), IA_OUTCOMES[outcomes[i]]) for i in sent]
+        for target, cop_data, outcome in referrals:
+            if self.agents_map.get(target.agent_id) is not target: continue
+            event_msg = self.refer_to_chief(target, cop_data, 'SEND_TO_CHIEF', outcome)
+            if event_msg: Hierarchy_Log.append(event_msg)
+        return Hierarchy_Log
+
+    def refer_to_chief(self, target, cop_data, ia_action, outcome):
+        """The Chief rules on an officer the IA sent up (and always learns from it). Returns an event message or ''."""
+        # Global Corruption for Chief's Context (running average)
+        avg_corr = self.pop_stats.avg_corruption
+
+        # Chief ALWAYS learns when IA sends someone
+        chief_action = self.chief.decide_punishment(outcome, cop_data, avg_corr)
+        chief_reward = self.chief.calculate_reward(chief_action, outcome, cop_data, avg_corr)
+        self.gradient_steps += self.chief.learn(chief_reward, train=not self.learn_at_batch_end)
         
+        # Execute the punishment
+        event_msg = ""
+        if chief_action == 'EXECUTE' and target.cop_type == 'corrupt':
+            success, msg = execute_and_replace_agent(target.agent_id, self.agents_map, self.corrupt_ids, self.db, reason="CHIEF_AI",
+                                                   checkpoints=self.checkpoints, rng=self.rngs.get('hiring', self.current_global_ep, target.agent_id),
+                                                   telemetry=self.telemetry, next_id=self.next_cop_id())
+            if success: self.rngs.retire(target.agent_id)
+            event_msg = f"⚖️ EXECUTION: Officer_{target.agent_id} eliminiated. {msg}"
+        elif chief_action == 'FIRE':
+             event_msg = f"⚖️ FIRED: Officer_{target.agent_id}."
+        
+        self.telemetry.enqueue("INSERT INTO investigations (episode, target_cop_id, outcome) VALUES (?, ?, ?)",
+                               (self.current_global_ep, target.agent_id, f"{ia_action}->{outcome}->{chief_action}"))
+        return event_msg
+
+    def collect_stats(self):
         return {
-            "episode": self.current_global_ep,
-            "log": log_entry,
-            "hierarchy_logs": Hierarchy_Log,
-            "stats": stats,
-            "turbo": self.turbo_mode,  # Include turbo status
-            "agents": [
-                {
-                    "id": uid, 
-                    "name": ag.name, 
-                    "type": ag.cop_type, 
-                    "corruption": getattr(ag, 'corruption_score', 0),
-                    "action": final_action
-                }
-                for uid, ag in self.agents_map.items()
-            ]
+            "corruption_level": self.pop_stats.avg_corruption,
+            "avg_wealth_corrupt": self.pop_stats.avg_wealth,
+            "chief_wealth": getattr(self.chief, 'total_money_earned', 0) if self.chief else 0,
+            "chief_executions": getattr(self.chief, 'executions', 0) if self.chief else 0,
+            "active_agents": len(self.agents_map)
         }
 
+    def record_stats(self, stats):
+        # PERSIST STATS TO DB (Fix for Blank Graphs) - queued, written in batches by the telemetry thread
+        self.telemetry.enqueue(
+            "INSERT INTO episode_stats (episode, corruption_level, avg_wealth, chief_wealth) VALUES (?, ?, ?, ?)",
+            (self.current_global_ep, stats["corruption_level"], stats["avg_wealth_corrupt"], stats["chief_wealth"])
+        )
+
+    def train_agents(self):
+        """Runs every learner's deferred optimizer steps (LEARN_AT_BATCH_END mode). Returns steps taken."""
+        steps = 0
+        if self.cop_brain is not None:
+            steps += self.cop_brain.train()
+        elif self.population is not None:
+            steps += self.population.train()
+        else:
+            steps += sum(self.agents_map[cid].train() for cid in self.corrupt_ids)
+        if self.ia: steps += self.ia.train()
+        if self.chief: steps += self.chief.train()
+        self.gradient_steps += steps
+        return steps
+
+    def next_scenario(self):
+        """
+        The current episode's scenario: row (episode-1) % SCENARIO_BATCH_SIZE of a pre-rolled batch whose
+        'scenarios' stream is keyed by its block number, so any episode finds its scenario without the ones before it.
+        """
+        block, row = divmod(self.current_global_ep - 1, config.SCENARIO_BATCH_SIZE)
+        if self.scenario_key != (block, config.SCENARIO_BATCH_SIZE):
+            self.scenario_pool = self.env.generate_batch(config.SCENARIO_BATCH_SIZE, self.rngs.get('scenarios', block))
+            self.scenario_key = (block, config.SCENARIO_BATCH_SIZE)
+        return self.env.scenario_at(self.scenario_pool, row)
+
     def execute_agent(self, agent_id):
         """Manually executes an agent via Supervisor Override."""
         if agent_id not in self.agents_map:
             return False, "Agent not found."
         
-        success, msg = execute_and_replace_agent(agent_id, self.agents_map, self.corrupt_ids, self.db, reason="SUPERVISOR_KILL")
+        episode = self.global_episodes + self.episode_counter
+        success, msg = execute_and_replace_agent(agent_id, self.agents_map, self.corrupt_ids, self.db, reason="SUPERVISOR_KILL",
+                                                   checkpoints=self.checkpoints, rng=self.rngs.get('hiring', episode, agent_id),
+                                                   telemetry=self.telemetry, next_id=self.next_cop_id())
+        if success: self.rngs.retire(agent_id)
         return success, msg
     
     def set_turbo_mode(self, enabled):
@@ -309,34 +513,61 @@ class SimulationEngine:
         self.turbo_mode = enabled
         return self.turbo_mode
 
-    def save_state(self):
-        with open(self.state_file, 'w') as f: 
-            json.dump({'total_episodes': self.global_episodes + self.episode_counter}, f)
-        for cid in self.corrupt_ids: self.agents_map[cid].save_brain()
-        if self.ia: self.ia.save_brain()
-        if self.chief: self.chief.save_brain()
+    def persist_agents(self):
+        """Queues the current stats of every agent into the cops table."""
+        self.telemetry.enqueue_many(
+            "UPDATE cops SET corruption_score=?, times_bribed=?, times_caught=?, total_money_earned=? WHERE cop_id=?",
+            [(getattr(a, 'corruption_score', 0), getattr(a, 'times_bribed', 0), getattr(a, 'times_caught', 0),
+              getattr(a, 'total_money_earned', 0), uid) for uid, a in self.agents_map.items()]
+        )
+
+    def save_state(self, wait=True):
+        """
+        Snapshots every brain and the episode count, and hands them to the checkpoint writer
+        (temp file + rename, off this thread). wait=False returns right away (autosave).
+        """
+        self.persist_agents()
+        writer = self.checkpoints
+        if config.CHECKPOINT_FORMAT == 'department':
+            writer.submit(config.CHECKPOINT_FILE, self.department_state(), dump=save_department)
+        else:
+            if self.population is not None: self.population.save_brains(writer)
+            else:
+                for cid in self.corrupt_ids: self.agents_map[cid].save_brain(writer)
+            if self.cop_brain: self.cop_brain.save_brain(writer)
+            if self.ia: self.ia.save_brain(writer)
+            if self.chief: self.chief.save_brain(writer)
+            # Written last: a resume never counts episodes whose brains are not on disk yet
+            writer.submit(self.state_file, self.run_state(), dump=dump_json)
+        if wait:
+            self.telemetry.flush()
+            writer.flush()
     
     def reset(self):
          self.global_episodes = 0
          self.episode_counter = 0
+         self.checkpoints.discard() # No queued autosave may resurrect the state or brain files
          
-         # 1. Try to delete state file to prevent 'Resume' logic
-         if os.path.exists(self.state_file):
-            try: os.remove(self.state_file)
-            except: pass
+         # 1. Try to delete state files to prevent 'Resume' logic
+         for path in (self.state_file, config.CHECKPOINT_FILE):
+            if os.path.exists(path):
+               try: os.remove(path)
+               except: pass
             
          # 2. Force Wipe In-Memory
          self.agents_map = {}
          self.corrupt_ids = []
          self.honest_ids = []
          
-         # 3. Force Wipe DB (Redundant safety check)
+         # 3. Force Wipe DB (Redundant safety check) - drain queued rows first so none land after the wipe
+         self.telemetry.flush()
          try:
              self.db.execute_query("DELETE FROM cops")
              self.db.execute_query("DELETE FROM bribe_history")
              self.db.execute_query("DELETE FROM investigations")
              self.db.execute_query("DELETE FROM orders")
              self.db.execute_query("DELETE FROM episode_stats")
+             self.db.execute_query("DELETE FROM episode_rollups")
          except: pass
 
          # 4. Re-Initialize (Will now definitely proceed as Fresh Start)
@@ -0,0 +1,55 @@
+import sys
+import time
+import argparse
+import config
+from simulation_engine import SimulationEngine
+
+def train(episodes, engine=None):
+    """
+    Headless training: runs the SimulationEngine for N episodes with no socket,
+    no printing, no narrative generation and no sleeping.
+    Returns throughput stats (episodes/sec and gradient-steps/sec).
+    """
+    config.VERBOSE = False
+    if engine is None:
+        engine = SimulationEngine()
+    engine.headless = True
+
+    start_grad_steps = engine.gradient_steps
+    start = time.perf_counter()
+    for _ in range(episodes):
+        engine.step()
+    elapsed = max(time.perf_counter() - start, 1e-9)
+
+    engine.save_state()
+    grad_steps = engine.gradient_steps - start_grad_steps
+    return {
+        'episodes': episodes,
+        'seconds': elapsed,
+        'episodes_per_sec': episodes / elapsed,
+        'gradient_steps': grad_steps,
+        'gradient_steps_per_sec': grad_steps / elapsed,
+        'total_episodes': engine.global_episodes + engine.episode_counter
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless high-throughput training run.")
+    parser.add_argument('episodes', type=int, nargs='?', default=config.SEASON_LENGTH, help="Episodes to simulate")
+    parser.add_argument('--workers', type=int, default=0, help="Rollout processes (0 = single process)")
+    parser.add_argument('--seed', type=int, default=config.SEED, help="Run seed for a fresh start (a resumed run keeps its own)")
+    args = parser.parse_args()
+    config.SEED = args.seed
+
+    if args.workers > 0:
+        from parallel_engine import ParallelTrainer
+        config.VERBOSE = False
+        report = ParallelTrainer(args.workers).run(args.episodes)
+    else:
+        report = train(args.episodes)
+    print(f"Trained {report['episodes']} episodes in {report['seconds']:.1f}s "
+          f"({report['episodes_per_sec']:.1f} episodes/sec, {report['gradient_steps_per_sec']:.1f} gradient-steps/sec). "
+          f"Total episodes: {report['total_episodes']}")
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding='utf-8')
+    main()
@@ -1,12 +1,18 @@
 import os
-import random
+import numpy as np
 import config # CHANGED
 from agents.corrupt_cop import CorruptCop
+from agents.checkpoint import atomic_save
 
-def execute_and_replace_agent(target_id, agents_map, corrupt_ids, db, reason="EXECUTE"):
+def execute_and_replace_agent(target_id, agents_map, corrupt_ids, db, reason="EXECUTE", checkpoints=None, rng=None, telemetry=None, next_id=None):
     """
     Handles the logic of killing an agent and spawning a successor.
     Shared by God Mode (manual) and Chief Logic (automatic).
+    The successor inherits from an in-memory snapshot; the dead officer's brain file is written
+    by `checkpoints` (a CheckpointWriter) in the background when given, else synchronously.
+    The successor's personality and corruption come from `rng` (the engine's seeded 'hiring' stream).
+    The cops table updates go through `telemetry` (a TelemetryWriter) when given, else are committed here.
+    next_id: id for the successor (default: one above the roster).
     """
     if target_id not in agents_map:
         return False, "Agent Not Found"
@@ -15,16 +21,25 @@ def execute_and_replace_agent(target_id, agents_map, corrupt_ids, db, reason="EX
     
     # Only CorruptCops have brains to save/inherit
     if cop.cop_type == 'corrupt':
-        cop.save_brain()
-        dead_brain_path = os.path.join(config.BRAIN_DIR, f"cop_{target_id}.pth")
+        inheritance = cop.brain_checkpoint() if cop.shared_brain is None else None
+        if inheritance is not None and config.CHECKPOINT_FORMAT == 'files': # Department checkpoints keep no per-officer files
+            dead_brain_path = os.path.join(config.BRAIN_DIR, f"cop_{target_id}.pth")
+            if checkpoints is not None: checkpoints.submit(dead_brain_path, inheritance)
+            else: atomic_save(inheritance, dead_brain_path)
         
         # Calculate next ID
-        next_cop_id = max(agents_map.keys()) + 1
+        next_cop_id = next_id if next_id is not None else max(agents_map.keys()) + 1
         
         # Spawn Replacement
         # Helper: get personalities randomly if not passed, but for now hardcoded list is fine or passed in
         personalities = ['greedy', 'cautious', 'paranoid'] 
-        new_agent = CorruptCop(next_cop_id, f"Officer_{next_cop_id}", random.choice(personalities), random.uniform(30,60))
+        # Retire the dead officer's registry row first so the successor reuses it (running sums read it before it is recycled)
+        stats = cop.stats
+        if stats is not None: stats.remove(cop)
+        cop.registry.release(cop.reg_slot)
+        rng = rng if rng is not None else np.random.default_rng()
+        new_agent = CorruptCop(next_cop_id, f"Officer_{next_cop_id}", personalities[rng.integers(len(personalities))], float(rng.uniform(30,60)),
+                               shared_brain=cop.shared_brain, slot=getattr(cop, 'slot', None), registry=cop.registry)
         
         # Cleanup Old
         if target_id in corrupt_ids: corrupt_ids.remove(target_id)
@@ -33,15 +48,21 @@ def execute_and_replace_agent(target_id, agents_map, corrupt_ids, db, reason="EX
         # Register New
         agents_map[next_cop_id] = new_agent
         corrupt_ids.append(next_cop_id)
+        if stats is not None: # Keep the engine's running averages in step with the roster
+            stats.add(new_agent)
         
-        # Brain Inheritance
-        new_agent.inherit_brain(dead_brain_path)
+        # Brain Inheritance (a shared-brain successor already took over the identity slot)
+        if inheritance is not None:
+            new_agent.inherit_brain(inheritance)
+        if cop.population is not None:
+            cop.population.replace(cop, new_agent)
         
         # Database Updates
         status_update = 'executed_by_player' if reason == 'PLAYER_KILL' else 'executed'
-        db.update_cop_status(target_id, status_update)
-        db.execute_query("INSERT INTO cops (cop_id, name, cop_type, rank, personality, corruption_score) VALUES (?, ?, ?, ?, ?, ?)", 
-                         (next_cop_id, new_agent.name, new_agent.cop_type, new_agent.rank, new_agent.personality, new_agent.corruption_score))
+        write = telemetry.enqueue if telemetry is not None else db.execute_query
+        write("UPDATE cops SET status=? WHERE cop_id=?", (status_update, target_id))
+        write("INSERT INTO cops (cop_id, name, cop_type, rank, personality, corruption_score) VALUES (?, ?, ?, ?, ?, ?)", 
+              (next_cop_id, new_agent.name, new_agent.cop_type, new_agent.rank, new_agent.personality, new_agent.corruption_score))
         
         return True, new_agent.name
     else:
@@ -0,0 +1,51 @@
+import threading
+import numpy as np
+
+class RosterDeltaEncoder:
+    """
+    Dashboard protocol state for UI_PROTOCOL = 'delta'. The roster (id, name, type) goes to a client
+    once; each frame then carries only roster additions/removals plus the ids and corruption values
+    that changed since the previous frame, packed as little-endian int32 / float32 byte arrays
+    (Socket.IO sends them as binary attachments; the browser reads them with Int32Array/Float32Array).
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forgets the baseline, e.g. after a simulation reset; the next frame re-adds everyone."""
+        with self.lock:
+            self.roster = {}  # id -> {'id', 'name', 'type'}
+            self.values = {}  # id -> float32 corruption last sent
+
+    def full(self):
+        """The baseline every client should hold (sent on connect)."""
+        with self.lock:
+            return [dict(entry, corruption=float(self.values[aid])) for aid, entry in self.roster.items()]
+
+    def encode(self, agents):
+        """Diffs a snapshot's agents list against the baseline, advances the baseline, returns the delta."""
+        with self.lock:
+            current = {a['id'] for a in agents}
+            removed = [aid for aid in self.roster if aid not in current]
+            for aid in removed:
+                del self.roster[aid], self.values[aid]
+
+            added, changed_ids, changed_values = [], [], []
+            for a in agents:
+                aid, value = a['id'], np.float32(a['corruption'])
+                if aid not in self.roster:
+                    self.roster[aid] = {'id': aid, 'name': a['name'], 'type': a['type']}
+                    self.values[aid] = value
+                    added.append(dict(self.roster[aid], corruption=float(value)))
+                elif self.values[aid] != value:
+                    self.values[aid] = value
+                    changed_ids.append(aid)
+                    changed_values.append(value)
+
+            return {
+                'added': added,
+                'removed': removed,
+                'ids': np.array(changed_ids, dtype='<i4').tobytes(),
+                'corruption': np.array(changed_values, dtype='<f4').tobytes()
+            }
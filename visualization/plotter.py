@@ -1,12 +1,28 @@
-import matplotlib.pyplot as plt
-import seaborn as sns
-import pandas as pd
+import importlib
 import os
 from config import RESULTS_DIR, DPI, FIG_SIZE_WIDE, FIG_SIZE_SQUARE
+from environment.outcomes import OUTCOME_NAMES, Outcome
+from database import exporter
+
+class _LazyModule:
+    """Imports the named module on first attribute access (matplotlib/seaborn/pandas take seconds to import)."""
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+plt = _LazyModule('matplotlib.pyplot')
+sns = _LazyModule('seaborn')
+pd = _LazyModule('pandas')
 
 class Plotter:
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, export_dir=None):
         self.db = db_manager
+        self.export_dir = export_dir # Read event tables from database.exporter files instead of SQLite
         # Ensure results dir exists
         os.makedirs(RESULTS_DIR, exist_ok=True)
         sns.set_style("darkgrid")
@@ -21,6 +37,15 @@ class Plotter:
         self.plot_witness_impact()
         print(f"Visualizations saved to {RESULTS_DIR}")
 
+    def read_export(self, table, columns):
+        """Loads exported columns as a DataFrame, turning the exporter's -1 / '' placeholders back into missing values."""
+        data = exporter.read_table(table, columns, export_dir=self.export_dir)
+        df = pd.DataFrame(data)
+        for col, values in data.items():
+            if values.dtype.kind == 'i': df[col] = df[col].where(df[col] != -1)
+            elif values.dtype.kind == 'U': df[col] = df[col].replace('', None)
+        return df
+
     def plot_corruption_hierarchy(self):
         """1. Bar chart: Average corruption by rank"""
         query = "SELECT rank, AVG(corruption_score) as avg_corr FROM cops GROUP BY rank"
@@ -39,12 +64,21 @@ class Plotter:
 
     def plot_success_rate(self):
         """2. Pie chart: Bribe outcomes distribution"""
-        query = "SELECT outcome, COUNT(*) as count FROM bribe_history GROUP BY outcome"
-        df = pd.read_sql_query(query, self.db.get_connection())
+        if self.export_dir:
+            df = self.read_export('bribe_history', ['outcome', 'outcome_code'])
+            df = df.groupby(['outcome', 'outcome_code'], dropna=False).size().reset_index(name='count')
+        else:
+            query = "SELECT outcome, outcome_code, COUNT(*) as count FROM bribe_history GROUP BY outcome, outcome_code"
+            df = pd.read_sql_query(query, self.db.get_connection())
         
         if df.empty:
             return
 
+        # Sampled engine rows carry integer codes; legacy log_transaction rows carry strings
+        names = df['outcome_code'].map(lambda c: OUTCOME_NAMES[int(c)] if pd.notna(c) else None)
+        df['outcome'] = df['outcome'].fillna(names)
+        df = df.groupby('outcome', as_index=False)['count'].sum()
+
         plt.figure(figsize=FIG_SIZE_SQUARE)
         colors = {'success': 'green', 'caught': 'red', 'rejected': 'gray'}
         # Map colors to data
@@ -78,8 +112,11 @@ class Plotter:
 
     def plot_investigations(self):
         """4. Bar chart: Investigation outcomes"""
-        query = "SELECT outcome, COUNT(*) as count FROM investigations GROUP BY outcome"
-        df = pd.read_sql_query(query, self.db.get_connection())
+        if self.export_dir:
+            df = self.read_export('investigations', ['outcome']).groupby('outcome').size().reset_index(name='count')
+        else:
+            query = "SELECT outcome, COUNT(*) as count FROM investigations GROUP BY outcome"
+            df = pd.read_sql_query(query, self.db.get_connection())
         
         if df.empty:
             return
@@ -96,13 +133,20 @@ class Plotter:
         # Ignoring rejected
         query = """
         SELECT witness_count, 
-               SUM(CASE WHEN outcome='success' THEN 1 ELSE 0 END) as successes,
-               SUM(CASE WHEN outcome='caught' THEN 1 ELSE 0 END) as caughts
+               SUM(CASE WHEN outcome='success' OR outcome_code=:success THEN 1 ELSE 0 END) as successes,
+               SUM(CASE WHEN outcome='caught' OR outcome_code=:caught THEN 1 ELSE 0 END) as caughts
         FROM bribe_history 
-        WHERE outcome IN ('success', 'caught')
+        WHERE outcome IN ('success', 'caught') OR outcome_code IN (:success, :caught)
         GROUP BY witness_count
         """
-        df = pd.read_sql_query(query, self.db.get_connection())
+        if self.export_dir:
+            df = self.read_export('bribe_history', ['witness_count', 'outcome', 'outcome_code'])
+            df['successes'] = ((df['outcome'] == 'success') | (df['outcome_code'] == Outcome.SUCCESS)).astype(int)
+            df['caughts'] = ((df['outcome'] == 'caught') | (df['outcome_code'] == Outcome.CAUGHT)).astype(int)
+            df = df[(df['successes'] + df['caughts']) > 0].groupby('witness_count', as_index=False)[['successes', 'caughts']].sum()
+        else:
+            df = pd.read_sql_query(query, self.db.get_connection(),
+                                   params={'success': int(Outcome.SUCCESS), 'caught': int(Outcome.CAUGHT)})
         
         if df.empty:
             return